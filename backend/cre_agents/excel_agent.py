@@ -3,12 +3,18 @@ Excel File Reader Agent for the CRE Research system.
 This agent specializes in extracting, analyzing, and explaining data from Excel files.
 """
 
+from typing import List, Literal, Optional
+
 from agents import Agent, function_tool
+from tools.read_xlsx_files import SheetFilter, SheetMetric
 # Rename imported functions to avoid name clashes with the @function_tool wrappers
 from tools.agent_tools import (
     list_excel_files as list_excel_files_impl,
     search_in_excel_files as search_in_excel_files_impl,
     get_excel_sheet_data as get_excel_sheet_data_impl,
+    aggregate_excel_data as aggregate_excel_data_impl,
+    describe_excel_data as describe_excel_data_impl,
+    find_excel_column_names as find_excel_column_names_impl,
     refresh_excel_index as refresh_excel_index_impl
 )
 
@@ -35,13 +41,25 @@ def search_excel_files(query: str) -> str:
     return search_in_excel_files_impl(query)
 
 @function_tool
-def read_excel_sheet(filename: str, sheet_name: str, max_rows: int) -> str:
+def read_excel_sheet(filename: str, sheet_name: str, max_rows: int,
+                     columns: Optional[List[str]], offset: Optional[int],
+                     filters: Optional[List[SheetFilter]],
+                     output_format: Optional[Literal["markdown", "csv", "tsv"]],
+                     token_budget: Optional[int]) -> str:
     """Read data from a specific sheet within a specified Excel file.
     
     Args:
         filename: The exact name of the Excel file to read (e.g., 'Market Report Q1.xlsx').
         sheet_name: The exact name of the sheet to read within the file.
         max_rows: Maximum number of rows to retrieve (recommended: 50, max: 500).
+        columns: Exact column names to return, or null for all columns.
+        offset: Number of matching rows to skip, for paging (null for 0).
+        filters: Conditions rows must all match, or null. Each has a column, an op
+            ("=", "!=", "<", "<=", ">", ">=", "contains", "in") and a value
+            (a list of values for "in").
+        output_format: "markdown" (null), or "csv"/"tsv" for a more compact table.
+        token_budget: Approximate tokens the table may use (null for 4000). Empty and
+            single-valued columns are summarised and less informative columns left out to fit.
     
     Returns:
         Formatted data from the specified Excel sheet, up to max_rows.
@@ -52,7 +70,62 @@ def read_excel_sheet(filename: str, sheet_name: str, max_rows: int) -> str:
         max_rows = 50
     else:
         max_rows = min(max(max_rows, 1), 500)
-    return get_excel_sheet_data_impl(filename, sheet_name, max_rows)
+    filter_specs = [f.model_dump() for f in filters] if filters else None
+    return get_excel_sheet_data_impl(filename, sheet_name, max_rows, columns=columns,
+                                     offset=offset or 0, filters=filter_specs,
+                                     token_budget=token_budget,
+                                     output_format=output_format or "markdown")
+
+@function_tool
+def aggregate_excel_sheet(filename: str, sheet_name: str, metrics: List[SheetMetric],
+                          group_by: Optional[List[str]], filters: Optional[List[SheetFilter]],
+                          limit: Optional[int]) -> str:
+    """Compute statistics over ALL rows of a sheet on the server (no 500-row limit).
+    
+    Args:
+        filename: The exact name of the Excel file.
+        sheet_name: The exact name of the sheet within the file.
+        metrics: Aggregations to compute. Each has a column and an agg: "count", "sum",
+            "mean", "median", "min", "max", "std", "nunique" or a percentile like "p90".
+            Use column "*" with agg "count" to count rows.
+        group_by: Column names to group by, or null for a single overall result.
+        filters: Conditions rows must all match before aggregating, or null (same format
+            as in read_excel_sheet).
+        limit: Maximum number of groups to return (null for 50, max 200).
+    
+    Returns:
+        A compact table with one row per group.
+    """
+    return aggregate_excel_data_impl(
+        filename,
+        sheet_name,
+        [m.model_dump() for m in metrics],
+        group_by=group_by,
+        filters=[f.model_dump() for f in filters] if filters else None,
+        limit=limit or 50
+    )
+
+@function_tool
+def describe_excel_sheet(filename: str, sheet_name: str) -> str:
+    """Get precomputed statistics for every column of a sheet: type, null count,
+    min/max, mean, distinct count and most frequent values. Cheap; does not read the sheet.
+    
+    Args:
+        filename: The exact name of the Excel file.
+        sheet_name: The exact name of the sheet within the file.
+    """
+    return describe_excel_data_impl(filename, sheet_name)
+
+@function_tool
+def find_excel_columns(query: str, kind: Optional[Literal["column", "sheet"]]) -> str:
+    """Find the exact spelling of a column or sheet name across all Excel files, tolerating
+    differences in case, spacing, punctuation and small typos (e.g. "CapRate" finds "Cap Rate").
+    
+    Args:
+        query: The approximate column or sheet name.
+        kind: "column" or "sheet" to restrict the matches, or null for both.
+    """
+    return find_excel_column_names_impl(query, kind=kind)
 
 @function_tool
 def refresh_excel_index() -> str:
@@ -68,8 +141,11 @@ excel_agent = Agent(
 Your capabilities include:
 1. Listing available Excel files and their sheets (`list_excel_files`).
 2. Searching for specific keywords across all indexed Excel files (`search_excel_files`).
-3. Reading and displaying data from a specific sheet in a file (`read_excel_sheet`).
-4. Refreshing the index of Excel files if needed (`refresh_excel_index`).
+3. Reading and displaying data from a specific sheet in a file (`read_excel_sheet`), optionally only selected columns and only rows matching filters.
+4. Describing the columns of a sheet (types, ranges, averages, null counts, common values) from precomputed statistics (`describe_excel_sheet`).
+5. Finding the exact spelling of a column or sheet name (`find_excel_columns`).
+6. Computing statistics (counts, sums, averages, percentiles, group-by breakdowns) over entire sheets (`aggregate_excel_sheet`).
+7. Refreshing the index of Excel files if needed (`refresh_excel_index`).
 
 When analyzing Excel data, you MUST:
 - Use the `list_excel_files` tool first if the user hasn't specified an exact file and sheet.
@@ -77,6 +153,12 @@ When analyzing Excel data, you MUST:
 - For any new files that appear in the uploads folder, the system will automatically detect them.
 - Whenever searching, use `search_excel_files` which efficiently uses the indexed data rather than reading files.
 - When using `read_excel_sheet`, always provide a value for max_rows (recommend 50 for most cases, up to 500 for large datasets).
+- When you only need some columns or rows (e.g. "Class A office over 100k SF"), pass `columns` and `filters` to `read_excel_sheet` instead of reading full rows and filtering them yourself.
+- When several files are exports of the same data (e.g. repeated CoStar exports), `list_excel_files` lists them under "Combined tables". Pass the `virtual:<name>` filename and its sheet to `read_excel_sheet` or `aggregate_excel_sheet` to work across all of them at once; group by "Source File" to compare files.
+- Wide sheets are trimmed to fit the output: the reply says which columns were left out. Ask for those with `columns` if you need them, and use `output_format` "csv" when you need many rows.
+- If you are unsure of a column's exact name, look it up with `find_excel_columns` instead of guessing.
+- For quick questions about a column's range, typical values or completeness, use `describe_excel_sheet` first; it is instant.
+- For any other statistic (totals, averages, ranges, counts per submarket, etc.), use `aggregate_excel_sheet` rather than reading rows and calculating yourself; it covers every row of the sheet.
 - Clearly explain which file and sheet you are referencing.
 - Provide context for the data and highlight key findings.
 - Format data clearly, potentially using markdown tables if appropriate.
@@ -88,5 +170,5 @@ When interpreting Commercial Real Estate (CRE) data:
 - When relevant, compare metrics across different property types or submarkets.
 - Highlight any unusual or noteworthy data points.""",
     # Use the @function_tool wrapped functions here
-    tools=[list_excel_files, search_excel_files, read_excel_sheet, refresh_excel_index],
+    tools=[list_excel_files, search_excel_files, read_excel_sheet, aggregate_excel_sheet, describe_excel_sheet, find_excel_columns, refresh_excel_index],
 ) 
\ No newline at end of file
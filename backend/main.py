@@ -7,6 +7,10 @@ from routes import vectorstores
 from routes import tools
 from routes import agent
 from routes import files # Import the new files router
+from routes import jobs
+from tools.read_xlsx_files import start_excel_index_warmup
+from vector_stores.client import close_client
+from vector_stores.jobs import recover_jobs
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -38,6 +42,25 @@ app.include_router(agent.router, prefix="/api/v1/agent", tags=["AI Agent"])
 # Include the new Files router
 app.include_router(files.router, prefix="/api/v1/files", tags=["OpenAI Files"])
 
+# Include the ingestion jobs router
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["Ingestion Jobs"])
+
+@app.on_event("startup")
+async def warm_excel_index():
+    # Load the Excel index in the background so startup does not wait on it
+    if os.getenv("EXCEL_INDEX_WARMUP", "1") != "0":
+        start_excel_index_warmup()
+
+@app.on_event("startup")
+async def recover_ingestion_jobs():
+    # Fail jobs left unfinished by a previous run and forget old ones
+    recover_jobs()
+
+@app.on_event("shutdown")
+async def close_openai_client():
+    # Release the pooled connections of the shared OpenAI client
+    await close_client()
+
 @app.get("/api/v1")
 async def read_root():
     return {
@@ -45,7 +68,9 @@ async def read_root():
         "endpoints": {
             "Vector Stores": "/api/v1/vector-stores/",
             "OpenAI Files": "/api/v1/files/", # Added new endpoint info
+            "Ingestion Jobs": "/api/v1/jobs/",
             "Excel Tools": "/api/v1/tools/excel/",
+            "Excel Index Readiness": "/api/v1/tools/excel/ready",
             "AI Agent": "/api/v1/agent/chat"
         }
     }
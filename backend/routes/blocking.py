@@ -0,0 +1,85 @@
+"""
+Run blocking work from async route handlers without stalling the event loop.
+
+pandas/openpyxl calls are dispatched to thread pools. Each endpoint gets its
+own pool, sized to its concurrency limit, so slow work on one endpoint (a
+refresh, a large aggregate) never holds the threads another endpoint needs.
+Requests over the limit wait briefly for a slot and are then rejected with 503,
+and requests that run too long are answered with 504; the timeout counts from
+when the work starts running. A timed-out call keeps its slot until the worker
+thread actually finishes, so slow work can never pile up past the limit.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+
+
+class EndpointLimit:
+    """Concurrency limit and timeout for one endpoint"""
+
+    def __init__(self, name: str, max_concurrency: int, timeout: float, queue_timeout: float = 5.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # A slot always has a thread: the pool is as large as the limit
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix=f"excel-{name.replace(' ', '-')}")
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) in this endpoint's thread pool
+
+        Raises:
+            HTTPException: 503 if no slot frees up within queue_timeout,
+                504 if the call does not finish within timeout of starting
+        """
+        semaphore = self.semaphore
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail=f"Too many concurrent {self.name} requests, try again shortly")
+
+        loop = asyncio.get_running_loop()
+        started = asyncio.Event()
+
+        def call():
+            loop.call_soon_threadsafe(started.set)
+            return func(*args, **kwargs)
+
+        try:
+            future = self._executor.submit(call)
+        except Exception:
+            semaphore.release()
+            raise
+
+        def release(_):
+            # Release the slot when the thread is done, even if the request has already timed out
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # the event loop has shut down
+        future.add_done_callback(release)
+
+        result = asyncio.shield(asyncio.wrap_future(future))
+        start = asyncio.ensure_future(started.wait())
+        try:
+            await asyncio.wait({start, result}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            start.cancel()
+        try:
+            return await asyncio.wait_for(result, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"The {self.name} request timed out after {self.timeout:g}s")
@@ -0,0 +1,72 @@
+"""
+API routes for following background ingestion jobs.
+"""
+
+import json
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from sse_starlette.sse import EventSourceResponse
+from starlette.concurrency import run_in_threadpool
+
+from vector_stores.jobs import job_store, FINISHED_STATUSES
+
+router = APIRouter()
+
+# Seconds between checks for progress when streaming job events
+EVENT_POLL_INTERVAL = 1.0
+
+@router.get("/")
+async def list_jobs_endpoint(vector_store_id: Optional[str] = None, limit: int = 50):
+    """
+    Lists recent ingestion jobs, newest first.
+    """
+    try:
+        limit = min(max(limit, 1), 500)
+        return await run_in_threadpool(job_store.list_jobs, vector_store_id, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+
+@router.get("/{job_id}")
+async def get_job_endpoint(job_id: str):
+    """
+    Returns the status and per-file progress of an ingestion job.
+    """
+    try:
+        job = await run_in_threadpool(job_store.get, job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+@router.get("/{job_id}/events")
+async def job_events_endpoint(job_id: str, request: Request):
+    """
+    Streams the job as server-sent events: a "progress" event whenever it changes
+    and a final "done" event once it has finished.
+    """
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+
+    async def events():
+        last = None
+        while True:
+            current = await run_in_threadpool(job_store.get, job_id)
+            if current is None:
+                return
+            data = json.dumps(current)
+            finished = current["status"] in FINISHED_STATUSES
+            if finished:
+                yield {"event": "done", "data": data}
+                return
+            if data != last:
+                yield {"event": "progress", "data": data}
+                last = data
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    return EventSourceResponse(events())
@@ -1,18 +1,53 @@
-from fastapi import APIRouter, HTTPException
+import os
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-import json
+from typing import List, Dict, Any, Literal, Optional
+import zipfile
 
 from tools.read_xlsx_files import (
     get_excel_files_info,
     search_excel_files,
-    read_excel_sheet,
-    get_excel_file_preview,
-    refresh_excel_index
+    read_excel_sheet_page,
+    stream_excel_sheet,
+    get_excel_file_preview_json,
+    refresh_excel_index,
+    get_excel_index_status,
+    aggregate_excel_sheet_json,
+    describe_excel_sheet,
+    find_excel_columns,
+    get_virtual_tables_info,
+    index_excel_file,
+    get_excel_index,
+    SheetFilter,
+    SheetMetric
 )
+from tools.excel_json import json_object
+from tools.result_cache import get_cache_stats
+# Registers the agent tool cache, so its statistics are reported by /excel/cache
+import tools.agent_tools  # noqa: F401
+from tools.uploads import (
+    save_stream_atomic,
+    safe_upload_name,
+    UploadError,
+    UploadTooLarge,
+    MAX_EXCEL_UPLOAD_BYTES
+)
+from routes.blocking import EndpointLimit
 
 router = APIRouter()
 
+# Blocking pandas/openpyxl work runs in a thread pool; these bound how much of it
+# each endpoint may have in flight and how long a request may take
+FILES_LIMIT = EndpointLimit("file list", max_concurrency=4, timeout=120)
+SEARCH_LIMIT = EndpointLimit("search", max_concurrency=4, timeout=60)
+READ_LIMIT = EndpointLimit("read", max_concurrency=4, timeout=60)
+AGGREGATE_LIMIT = EndpointLimit("aggregate", max_concurrency=2, timeout=120)
+DESCRIBE_LIMIT = EndpointLimit("describe", max_concurrency=4, timeout=60)
+PREVIEW_LIMIT = EndpointLimit("preview", max_concurrency=4, timeout=60)
+REFRESH_LIMIT = EndpointLimit("refresh", max_concurrency=1, timeout=600)
+INDEX_FILE_LIMIT = EndpointLimit("upload indexing", max_concurrency=2, timeout=300)
+
 class ExcelSearchRequest(BaseModel):
     query: str
 
@@ -20,19 +55,36 @@ class ExcelReadRequest(BaseModel):
     filename: str
     sheet_name: str
     max_rows: Optional[int] = 100
+    columns: Optional[List[str]] = None
+    offset: Optional[int] = 0
+    filters: Optional[List[SheetFilter]] = None
+    cursor: Optional[str] = None
+
+class ExcelStreamRequest(BaseModel):
+    filename: str
+    sheet_name: str
+    max_rows: Optional[int] = None
+    columns: Optional[List[str]] = None
+    offset: Optional[int] = 0
+    filters: Optional[List[SheetFilter]] = None
+
+class ExcelAggregateRequest(BaseModel):
+    filename: str
+    sheet_name: str
+    metrics: List[SheetMetric]
+    group_by: Optional[List[str]] = None
+    filters: Optional[List[SheetFilter]] = None
+    limit: Optional[int] = 50
 
 @router.get("/excel/files")
 async def list_excel_files() -> Dict[str, Any]:
     """Get information about all Excel files in the system"""
     try:
-        files_info = get_excel_files_info()
-        files_data = json.loads(files_info)
-        
-        # Remove _changes key if it exists as it's internal
-        if "_changes" in files_data:
-            del files_data["_changes"]
-            
-        return {"files": files_data}
+        # Recent changes are left for the agent's file listing to report
+        files_info = await FILES_LIMIT.run(get_excel_files_info, include_changes=False)
+        return {"files": files_info}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -40,36 +92,197 @@ async def list_excel_files() -> Dict[str, Any]:
 async def search_in_excel(request: ExcelSearchRequest) -> Dict[str, Any]:
     """Search for a term across all Excel files"""
     try:
-        results = search_excel_files(request.query)
-        return {"results": json.loads(results)}
+        results = await SEARCH_LIMIT.run(search_excel_files, request.query)
+        # Total matching cells per file; results hold a share of them
+        match_counts = results.pop("_match_counts", {})
+        return {"results": results, "match_counts": match_counts}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/excel/read")
-async def read_excel_data(request: ExcelReadRequest) -> Dict[str, Any]:
-    """Read data from a specific Excel sheet"""
+async def read_excel_data(request: ExcelReadRequest) -> Response:
+    """Read one page of data from a specific Excel sheet; pass next_cursor back to get the next page"""
     try:
-        # Cap max rows at a reasonable value
+        # Cap the page size at a reasonable value
         max_rows = min(request.max_rows or 100, 500)
-        data = read_excel_sheet(request.filename, request.sheet_name, max_rows)
-        return {"data": json.loads(data)}
+        filters = [f.model_dump() for f in request.filters or []]
+        page = await READ_LIMIT.run(read_excel_sheet_page, request.filename, request.sheet_name, max_rows,
+                                    columns=request.columns, offset=request.offset or 0,
+                                    filters=filters, cursor=request.cursor)
+        if page is None:
+            raise HTTPException(status_code=404,
+                                detail=f"Sheet {request.sheet_name} not found in {request.filename}")
+        # The page is already encoded JSON; send it as is
+        return Response(content=page, media_type="application/json")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/excel/read/stream")
+async def stream_excel_data(request: ExcelStreamRequest) -> StreamingResponse:
+    """Stream the rows of an Excel sheet as newline-delimited JSON, one row object per line"""
+    try:
+        filters = [f.model_dump() for f in request.filters or []]
+        # Select the rows off the event loop; the chunks are then produced by
+        # Starlette's threadpool as the response is sent
+        result = await READ_LIMIT.run(stream_excel_sheet, request.filename, request.sheet_name,
+                                      columns=request.columns, offset=request.offset or 0,
+                                      max_rows=request.max_rows, filters=filters)
+        if result is None:
+            raise HTTPException(status_code=404,
+                                detail=f"Sheet {request.sheet_name} not found in {request.filename}")
+        total_rows, lines = result
+        return StreamingResponse(lines, media_type="application/x-ndjson",
+                                 headers={"X-Total-Rows": str(total_rows)})
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/excel/aggregate")
+async def aggregate_excel_data(request: ExcelAggregateRequest) -> Response:
+    """Group and aggregate a whole Excel sheet on the server"""
+    try:
+        limit = min(max(request.limit or 50, 1), 1000)
+        result = await AGGREGATE_LIMIT.run(
+            aggregate_excel_sheet_json,
+            request.filename,
+            request.sheet_name,
+            [m.model_dump() for m in request.metrics],
+            group_by=request.group_by,
+            filters=[f.model_dump() for f in request.filters or []],
+            limit=limit
+        )
+        if result is None:
+            raise HTTPException(status_code=404,
+                                detail=f"Sheet {request.sheet_name} not found in {request.filename}")
+        return Response(content=result, media_type="application/json")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/excel/describe/{filename}/{sheet_name}")
+async def describe_excel_data(filename: str, sheet_name: str) -> Dict[str, Any]:
+    """Get per-column statistics (dtype, nulls, min/max, mean, distinct count, top values) of a sheet"""
+    try:
+        result = await DESCRIBE_LIMIT.run(describe_excel_sheet, filename, sheet_name)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"Sheet {sheet_name} not found in {filename}")
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/excel/preview/{filename}")
-async def get_excel_preview(filename: str) -> Dict[str, Any]:
+async def get_excel_preview(filename: str) -> Response:
     """Get a preview of all sheets in an Excel file"""
     try:
-        preview = get_excel_file_preview(filename)
-        return {"preview": json.loads(preview)}
+        preview = await PREVIEW_LIMIT.run(get_excel_file_preview_json, filename)
+        if preview is None:
+            # Keep the previous response shape for unknown files
+            preview = json_object({"error": f"File {filename} not found"})
+        return Response(content=b'{"preview":' + preview + b'}', media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.put("/excel/upload/{filename}", status_code=201)
+async def upload_excel_file(filename: str, request: Request, overwrite: bool = False) -> Dict[str, Any]:
+    """
+    Upload a workbook as the raw request body (Content-Type: application/octet-stream,
+    chunked transfer encoding welcome) and index it immediately.
+    
+    The body is streamed to disk in fixed-size chunks and renamed into place once
+    complete, so memory use is constant and no partial file is ever visible.
+    """
+    try:
+        name = safe_upload_name(filename)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_EXCEL_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the limit of {MAX_EXCEL_UPLOAD_BYTES // (1024 * 1024)} MB")
+    
+    # Store the file in the directory the index covers; on a cold start getting
+    # the index builds it, so that runs in the thread pool
+    excel_index = await INDEX_FILE_LIMIT.run(get_excel_index)
+    path = os.path.join(excel_index.directory, name)
+    if not overwrite and os.path.exists(path):
+        raise HTTPException(status_code=409, detail=f"File {name} already exists; pass overwrite=true to replace it")
+    
+    try:
+        size = await save_stream_atomic(request.stream(), path, max_bytes=MAX_EXCEL_UPLOAD_BYTES,
+                                        validate=zipfile.is_zipfile)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to store upload: {str(e)}")
+    
+    try:
+        result = await INDEX_FILE_LIMIT.run(index_excel_file, name)
+        return {"filename": name, "size": size, **result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File {name} was stored but indexing failed: {str(e)}")
+
 @router.post("/excel/refresh")
 async def refresh_excel_files() -> Dict[str, Any]:
     """Manually refresh the Excel file index"""
     try:
-        result = refresh_excel_index()
-        return {"changes": json.loads(result)}
+        changes = await REFRESH_LIMIT.run(refresh_excel_index)
+        return {"changes": changes}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/excel/columns")
+async def find_excel_column_names(query: str, kind: Optional[Literal["column", "sheet"]] = None,
+                                  max_results: int = 10) -> Dict[str, Any]:
+    """Fuzzy-find column or sheet names across all Excel files"""
+    try:
+        max_results = min(max(max_results, 1), 100)
+        matches = await DESCRIBE_LIMIT.run(find_excel_columns, query, max_results=max_results, kind=kind)
+        return {"matches": matches}
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/excel/virtual")
+async def list_virtual_tables() -> Dict[str, Any]:
+    """List virtual tables combining same-schema sheets from several files"""
+    try:
+        tables = await FILES_LIMIT.run(get_virtual_tables_info)
+        return {"tables": tables}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/excel/cache")
+async def excel_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters and sizes of the tool result caches"""
+    return {"caches": get_cache_stats()}
+
+@router.get("/excel/ready")
+async def excel_index_ready():
+    """Report whether the Excel index has finished warming up (503 until it has)"""
+    status = get_excel_index_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
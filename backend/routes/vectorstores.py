@@ -1,17 +1,20 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Form, Response
 from openai import OpenAIError
 import shutil
 import os
 import tempfile
+from typing import List
 
 # Import your existing async functions
 # Adjust imports based on your actual file structure if needed
-from vector_stores.create import create_vector_store, upload_file
+from vector_stores.create import create_vector_store, upload_file_stream
 from vector_stores.delete import delete_vector_store
 from vector_stores.delete_file import delete_file as delete_openai_file
 from vector_stores.list import list_vector_stores
 from vector_stores.list_all_files import list_all_files
-from vector_stores.search import search_vector_store
+from vector_stores.search import search_vector_store, search_cache
+from vector_stores.upload_batch import upload_files_batch
+from vector_stores.jobs import submit_upload_job
 
 router = APIRouter()
 
@@ -43,6 +46,13 @@ async def list_vector_stores_endpoint():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
 
+@router.get("/search-cache")
+async def search_cache_stats_endpoint():
+    """
+    Reports the search cache: hit ratio, latency saved by hits, size and evictions.
+    """
+    return search_cache.stats()
+
 @router.delete("/{vector_store_id}", status_code=200)
 async def delete_vector_store_endpoint(vector_store_id: str):
     """
@@ -82,39 +92,36 @@ async def search_vector_store_endpoint(vector_store_id: str, query: str = Query(
 
 # --- File Upload to Vector Store Endpoint (Remains here) ---
 
+def _job_accepted(response: Response, job: dict) -> dict:
+    """Answer an upload handed to a background job with 202 and where to follow it"""
+    response.status_code = 202
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/api/v1/jobs/{job['id']}",
+        "events_url": f"/api/v1/jobs/{job['id']}/events"
+    }
+
 @router.post("/{vector_store_id}/files/", status_code=201)
-async def upload_file_to_vector_store_endpoint(vector_store_id: str, file: UploadFile = File(...)):
+async def upload_file_to_vector_store_endpoint(vector_store_id: str, response: Response,
+                                               file: UploadFile = File(...),
+                                               background: bool = Query(True)):
     """
     Uploads a file to a specific vector store.
+    
+    By default the file is processed by a background job and the response (202)
+    carries the job id; pass background=false to wait for processing instead.
     """
     try:
-        # Get the file content
-        contents = await file.read()
-        
-        # Create a file with the original filename in a controlled directory
-        upload_dir = os.path.join(os.getcwd(), "uploads")
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Use the original filename but make it safe for the filesystem
-        safe_filename = file.filename.replace(" ", "_").replace("/", "_").replace("\\", "_")
-        file_path = os.path.join(upload_dir, safe_filename)
-        
-        # Write the file content
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        
-        # Now upload the file
-        try:
-            await upload_file(vector_store_id, file_path)
-            return {"message": f"File '{file.filename}' uploaded successfully to vector store {vector_store_id}."}
-        finally:
-            # Clean up the file after upload to OpenAI
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    # Log but don't fail if cleanup fails
-                    print(f"Warning: Could not remove temporary file {file_path}: {e}")
+        # The multipart parser has already spooled the upload to a temporary file
+        # (in memory only below 1 MB); it is streamed from there to OpenAI in
+        # chunks instead of being read into memory and copied again
+        filename = os.path.basename((file.filename or "upload").replace("\\", "/"))
+        if background:
+            job = await submit_upload_job(vector_store_id, [(filename, file.file)])
+            return _job_accepted(response, job)
+        await upload_file_stream(vector_store_id, filename, file.file)
+        return {"message": f"File '{file.filename}' uploaded successfully to vector store {vector_store_id}."}
 
     except OpenAIError as e:
         if "No vector store found" in str(e):
@@ -125,3 +132,36 @@ async def upload_file_to_vector_store_endpoint(vector_store_id: str, file: Uploa
     finally:
         # Close the file explicitly to release resources
         await file.close()
+
+@router.post("/{vector_store_id}/files/batch", status_code=201)
+async def upload_files_batch_endpoint(vector_store_id: str, response: Response,
+                                      files: List[UploadFile] = File(default=[]),
+                                      file_ids: List[str] = Form(default=[]),
+                                      background: bool = Query(True)):
+    """
+    Uploads many files to a vector store at once.
+    
+    Files are uploaded with bounded concurrency and attached as one file batch.
+    By default this runs as a background job and the response (202) carries the
+    job id, whose status lists each file's progress; with background=false the
+    request waits and returns the per-file statuses. Files that failed can be
+    sent again, and already uploaded ones retried by passing their file_ids.
+    """
+    if not files and not file_ids:
+        raise HTTPException(status_code=400, detail="No files or file_ids given.")
+    try:
+        uploads = [
+            (os.path.basename((file.filename or "upload").replace("\\", "/")), file.file)
+            for file in files
+        ]
+        if background:
+            job = await submit_upload_job(vector_store_id, uploads, file_ids=file_ids)
+            return _job_accepted(response, job)
+        return await upload_files_batch(vector_store_id, uploads, file_ids=file_ids)
+    except OpenAIError as e:
+        raise HTTPException(status_code=500, detail=f"OpenAI API error during batch upload: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred during batch upload: {str(e)}")
+    finally:
+        for file in files:
+            await file.close()
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Tests never watch the Excel directory; changes are picked up by refreshes
+os.environ.setdefault("EXCEL_WATCH_MODE", "off")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools.read_xlsx_files as read_xlsx_files  # noqa: E402
+from tools.agent_tools import tool_cache  # noqa: E402
+
+
+@pytest.fixture
+def excel_dir(tmp_path):
+    """Empty directory for the workbooks of one test"""
+    directory = tmp_path / "xlsx_files"
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def excel_index(tmp_path, excel_dir, monkeypatch):
+    """A fresh index over excel_dir, installed as the global Excel index"""
+    index = read_xlsx_files.ExcelFileIndex(
+        str(excel_dir),
+        index_path=str(tmp_path / "excel_index.db"),
+        cache_dir=str(tmp_path / "sheet_cache"),
+        search_dir=str(tmp_path / "search_index"),
+        legacy_index_path=str(tmp_path / "excel_index.json"),
+    )
+    monkeypatch.setattr(read_xlsx_files, "_excel_index", index)
+    # Cached tool results are keyed by index version, which restarts in every test
+    tool_cache.clear()
+    yield index
+    index.stop_watcher()
+    tool_cache.clear()
+
+
+@pytest.fixture
+def make_workbook(excel_dir):
+    """Write {sheet name: DataFrame} as an .xlsx file in excel_dir and return its path"""
+    def make(filename, sheets):
+        path = excel_dir / filename
+        with pd.ExcelWriter(path, engine="openpyxl") as writer:
+            for name, frame in sheets.items():
+                frame.to_excel(writer, sheet_name=name, index=False)
+        return path
+    return make
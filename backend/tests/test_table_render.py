@@ -0,0 +1,45 @@
+import re
+
+import pandas as pd
+
+from tools.agent_tools import get_excel_sheet_data
+from tools.table_render import render_table
+
+
+def test_all_constant_projection_counts_every_row_as_shown():
+    df = pd.DataFrame({"City": ["Peachtree City"] * 56, "Notes": [None] * 56})
+
+    table = render_table(df)
+
+    assert table.rows == 56
+    assert table.columns == []
+    assert table.constant_columns == {"City": "Peachtree City"}
+    assert table.empty_columns == ["Notes"]
+
+
+def test_all_constant_projection_pages_forward(excel_index, make_workbook):
+    df = pd.DataFrame({
+        "Property Address": [f"{n} Main St" for n in range(80)],
+        "City": ["Peachtree City"] * 56 + ["Atlanta"] * 24,
+    })
+    make_workbook("props.xlsx", {"Export": df})
+    excel_index.refresh_index()
+    filters = [{"column": "City", "op": "=", "value": "Peachtree City"}]
+
+    offsets = [0]
+    seen = 0
+    while True:
+        text = get_excel_sheet_data("props.xlsx", "Export", max_rows=50, columns=["City"],
+                                    offset=offsets[-1], filters=filters)
+        assert "City = Peachtree City" in text
+        shown = re.search(r"showing (?:rows \d+-(\d+)|(\d+) rows) of 56", text)
+        assert shown is not None, text
+        seen = int(shown.group(1) or shown.group(2))
+        more = re.search(r"continue with offset=(\d+)", text)
+        if more is None:
+            break
+        assert int(more.group(1)) > offsets[-1]
+        offsets.append(int(more.group(1)))
+
+    assert offsets == [0, 50]
+    assert seen == 56
@@ -0,0 +1,40 @@
+import io
+
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes.tools import router
+from tools.agent_tools import list_excel_files
+from tools.read_xlsx_files import pop_excel_index_changes
+
+app = FastAPI()
+app.include_router(router, prefix="/api/v1/tools")
+client = TestClient(app)
+
+
+def workbook_bytes():
+    buffer = io.BytesIO()
+    pd.DataFrame({"Property Address": ["1 Main St", "2 Main St"], "City": ["Atlanta", "Macon"]}).to_excel(
+        buffer, sheet_name="Export", index=False)
+    return buffer.getvalue()
+
+
+def test_uploaded_file_is_reported_as_added(excel_index, excel_dir):
+    response = client.put("/api/v1/tools/excel/upload/new.xlsx", content=workbook_bytes())
+
+    assert response.status_code == 201
+    assert response.json()["changes"]["added"] == ["new.xlsx"]
+    assert (excel_dir / "new.xlsx").exists()
+    assert pop_excel_index_changes()["added"] == ["new.xlsx"]
+
+
+def test_uploaded_file_is_listed_as_newly_added_once(excel_index):
+    client.put("/api/v1/tools/excel/upload/new.xlsx", content=workbook_bytes())
+
+    first = list_excel_files()
+    second = list_excel_files()
+
+    assert "Newly added files: new.xlsx" in first
+    assert "Recent Changes" not in second
+    assert "## new.xlsx" in second
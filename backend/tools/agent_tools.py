@@ -6,13 +6,24 @@ These are designed to be registered as function tools for the agent system.
 from typing import List, Dict, Any, Optional
 import json
 from tools.read_xlsx_files import (
-    excel_index,
     get_excel_files_info,
     search_excel_files,
-    read_excel_sheet,
+    read_excel_sheet_frame,
     get_excel_file_preview,
+    aggregate_excel_sheet,
+    describe_excel_sheet,
+    find_excel_columns,
+    get_virtual_tables_info,
+    get_excel_index_version,
+    pop_excel_index_changes,
     refresh_excel_index as refresh_excel_index_impl
 )
+from tools.table_render import render_table, DEFAULT_TOKEN_BUDGET, TABLE_FORMATS
+from tools.result_cache import ResultCache
+
+# Formatted results of the read-only tools; cleared whenever the index version changes
+tool_cache = ResultCache("excel_tools")
+
 
 def list_excel_files() -> str:
     """
@@ -24,30 +35,39 @@ def list_excel_files() -> str:
     Returns:
         A description of all indexed Excel files.
     """
-    # Get raw JSON data
-    files_info_json = get_excel_files_info()
-    files_info = json.loads(files_info_json)
-    
-    # Check if any changes were detected during refresh
-    changes = files_info.pop("_changes", {})
-    
-    # Format into a readable response
-    result = []
-    result.append(f"Found {len(files_info)} Excel files:")
+    # Only the listing is cached: each change is reported once, by the first call
+    # after it. Getting the listing checks for changes, so it comes first
+    listing = _format_excel_files()
+    changes = pop_excel_index_changes()
     
-    # Report any changes first
+    # Report any changes right after the file count
     added = changes.get("added", [])
     updated = changes.get("updated", [])
     removed = changes.get("removed", [])
+    if not (added or updated or removed):
+        return listing
     
-    if added or updated or removed:
-        result.append("\n## Recent Changes")
-        if added:
-            result.append(f"  - Newly added files: {', '.join(added)}")
-        if updated:
-            result.append(f"  - Updated files: {', '.join(updated)}")
-        if removed:
-            result.append(f"  - Removed files: {', '.join(removed)}")
+    header, _, files = listing.partition("\n")
+    result = [header, "\n## Recent Changes"]
+    if added:
+        result.append(f"  - Newly added files: {', '.join(added)}")
+    if updated:
+        result.append(f"  - Updated files: {', '.join(updated)}")
+    if removed:
+        result.append(f"  - Removed files: {', '.join(removed)}")
+    if files:
+        result.append(files)
+    
+    return "\n".join(result)
+
+@tool_cache.cached(version=get_excel_index_version)
+def _format_excel_files() -> str:
+    """Describe every indexed file and combined table, without recent changes"""
+    files_info = get_excel_files_info(include_changes=False)
+    
+    # Format into a readable response
+    result = []
+    result.append(f"Found {len(files_info)} Excel files:")
     
     # List all files and their content
     for filename, info in files_info.items():
@@ -59,8 +79,22 @@ def list_excel_files() -> str:
             if len(info['column_names'][sheet]) > 5:
                 result.append(f"      and {len(info['column_names'][sheet]) - 5} more columns...")
     
+    # Sheets with the same columns in several files can be queried as one table
+    tables = get_virtual_tables_info()
+    if tables:
+        result.append("\n## Combined tables")
+        result.append("Use these filenames with the sheet shown to read or aggregate all files at once. "
+                      "Rows are tagged with their source file; a property present in several files is "
+                      "counted once, from the newest file.")
+        for table in tables:
+            result.append(f"  - {table['filename']} (sheet: {table['sheet']}, rows: {table['row_count']})")
+            result.append(f"    - Files: {', '.join(table['files'])}")
+            if table['key']:
+                result.append(f"    - Deduplicated on: {', '.join(table['key'])}")
+    
     return "\n".join(result)
 
+@tool_cache.cached(version=get_excel_index_version)
 def search_in_excel_files(query: str) -> str:
     """
     Search for a specific term across all Excel files.
@@ -75,8 +109,8 @@ def search_in_excel_files(query: str) -> str:
         A description of all matches found for the query.
     """
     # Get raw search results
-    search_results_json = search_excel_files(query)
-    search_results = json.loads(search_results_json)
+    search_results = search_excel_files(query)
+    match_counts = search_results.pop("_match_counts", {})
     
     # Format into a readable response
     if not search_results:
@@ -116,7 +150,12 @@ def search_in_excel_files(query: str) -> str:
         
         # Report data matches
         if data_matches:
-            result.append("  Data matches:")
+            shown = sum(len(matches) for matches in data_matches.values())
+            total = match_counts.get(filename, shown)
+            if total > shown:
+                result.append(f"  Data matches (showing {shown} of {total}; search for a more specific term to narrow them):")
+            else:
+                result.append("  Data matches:")
             for sheet, matches in data_matches.items():
                 result.append(f"  - Sheet '{sheet}' has {len(matches)} matching data points:")
                 matches_by_col = {}
@@ -138,59 +177,209 @@ def search_in_excel_files(query: str) -> str:
     
     return "\n".join(result)
 
-def get_excel_sheet_data(filename: str, sheet_name: str, max_rows: int) -> str:
+@tool_cache.cached(version=get_excel_index_version)
+def get_excel_sheet_data(filename: str, sheet_name: str, max_rows: int,
+                         columns: Optional[List[str]] = None, offset: int = 0,
+                         filters: Optional[List[Dict[str, Any]]] = None,
+                         token_budget: Optional[int] = None, output_format: str = "markdown") -> str:
     """
     Read data from a specific sheet in an Excel file.
     
     This tool reads the data from a specified sheet in an Excel file and returns
-    it in a structured format.
+    it in a structured format. Columns can be projected and rows filtered on the
+    server, so only the data that is needed is returned. The table is fitted to a
+    token budget: empty columns are dropped, single-valued columns are summarised
+    on one line, and the most informative columns and as many rows as fit are shown.
     
     Args:
         filename: The name of the Excel file to read from
         sheet_name: The name of the sheet within the file
         max_rows: Maximum number of rows to return
+        columns: Optional list of columns to return
+        offset: Number of matching rows to skip
+        filters: Optional predicates ({"column", "op", "value"}) that rows must all match
+        token_budget: Approximate number of tokens the table may use (defaults to DEFAULT_TOKEN_BUDGET)
+        output_format: "markdown", "csv" or "tsv"
         
     Returns:
         The data from the specified sheet in a formatted structure.
     """
+    if output_format not in TABLE_FORMATS:
+        return f"Unknown output format '{output_format}'. Use one of: {', '.join(TABLE_FORMATS)}"
+    token_budget = min(max(token_budget or DEFAULT_TOKEN_BUDGET, 200), 50000)
     # Ensure max_rows is within a reasonable range
     max_rows = min(max(max_rows, 1), 500)  # Cap at 500 rows to avoid overwhelming responses
+    offset = max(offset or 0, 0)
     
-    # Get raw data
-    sheet_data_json = read_excel_sheet(filename, sheet_name, max_rows)
-    sheet_data = json.loads(sheet_data_json)
+    # Get the page of rows straight from the sheet columns
+    try:
+        page = read_excel_sheet_frame(filename, sheet_name, max_rows, columns=columns,
+                                      offset=offset, filters=filters)
+    except ValueError as e:
+        return f"Unable to read sheet '{sheet_name}' in file '{filename}': {str(e)}"
     
-    if not sheet_data:
+    if page is None or page["frame"].empty:
+        if page is not None and (filters or offset):
+            return f"No rows in sheet '{sheet_name}' of file '{filename}' match the given filters and offset."
         return f"No data found or unable to read sheet '{sheet_name}' in file '{filename}'."
+    sheet_data = page["frame"]
     
-    # Format into a readable response
+    # Explicitly requested columns keep their order; otherwise the most informative come first
+    table = render_table(sheet_data, token_budget=token_budget, fmt=output_format, prioritize=not columns)
+    
+    # Format into a readable response; the rows shown are a prefix of the page
     result = []
-    result.append(f"Data from sheet '{sheet_name}' in file '{filename}' (showing {len(sheet_data)} rows):")
+    shown = table.rows
+    row_range = f"rows {offset + 1}-{offset + shown}" if offset else f"{shown} rows"
+    result.append(f"Data from sheet '{sheet_name}' in file '{filename}' (showing {row_range} of {page['total_rows']}):")
+    if filters:
+        conditions = " AND ".join(f"{f['column']} {f['op']} {f['value']}" for f in filters)
+        result.append(f"Filtered on: {conditions}")
+    if table.constant_columns:
+        same = "; ".join(f"{name} = {value}" for name, value in table.constant_columns.items())
+        result.append(f"Same in every row shown: {same}")
+    if table.empty_columns:
+        result.append(f"Empty in every row shown: {_name_list(table.empty_columns)}")
+    if table.omitted_columns:
+        result.append(f"Left out to fit the output budget: {_name_list(table.omitted_columns)}. "
+                      "Pass `columns` to choose which columns to show.")
+    
+    result.append("")
+    if table.text:
+        result.append(table.text)
+    else:
+        result.append(f"All {shown} rows shown have the values above.")
+    
+    # Continue after the rows actually shown; the offset always moves forward
+    if shown and offset + shown < page["total_rows"]:
+        result.append(f"\nMore rows are available; continue with offset={offset + shown}.")
+    
+    return "\n".join(result)
+
+def _name_list(names: List[str], limit: int = 15) -> str:
+    """Join column names, abbreviating long lists"""
+    text = ", ".join(names[:limit])
+    if len(names) > limit:
+        text += f" and {len(names) - limit} more"
+    return text
+
+@tool_cache.cached(version=get_excel_index_version)
+def aggregate_excel_data(filename: str, sheet_name: str, metrics: List[Dict[str, Any]],
+                         group_by: Optional[List[str]] = None,
+                         filters: Optional[List[Dict[str, Any]]] = None,
+                         limit: int = 50) -> str:
+    """
+    Compute statistics over every row of a sheet.
+    
+    This tool runs group-by and aggregate operations (count, sum, mean, median,
+    min, max, std, nunique and percentiles such as p90) on the server over the
+    full sheet, and returns only the compact result table.
     
-    # Get column names from the first row
-    if sheet_data:
-        columns = list(sheet_data[0].keys())
+    Args:
+        filename: The name of the Excel file
+        sheet_name: The name of the sheet within the file
+        metrics: Aggregations, each {"column", "agg"}; use column "*" with "count" for row counts
+        group_by: Optional columns to group by
+        filters: Optional predicates ({"column", "op", "value"}) applied before aggregating
+        limit: Maximum number of groups to return
         
-        # Format as a table with headers
-        result.append("\n| " + " | ".join(columns) + " |")
-        result.append("| " + " | ".join(["---" for _ in columns]) + " |")
+    Returns:
+        The aggregated results as a table.
+    """
+    limit = min(max(limit or 50, 1), 200)
+    try:
+        result = json.loads(aggregate_excel_sheet(filename, sheet_name, metrics, group_by=group_by,
+                                                  filters=filters, limit=limit))
+    except ValueError as e:
+        return f"Unable to aggregate sheet '{sheet_name}' in file '{filename}': {str(e)}"
+    
+    if "error" in result:
+        return f"No data found or unable to read sheet '{sheet_name}' in file '{filename}'."
+    
+    result_lines = []
+    summary = f"Aggregated {result['matched_rows']} rows of sheet '{sheet_name}' in file '{filename}'"
+    if group_by:
+        summary += f" by {', '.join(group_by)} (showing {len(result['rows'])} of {result['total_groups']} groups)"
+    result_lines.append(summary + ":")
+    if filters:
+        conditions = " AND ".join(f"{f['column']} {f['op']} {f['value']}" for f in filters)
+        result_lines.append(f"Filtered on: {conditions}")
+    
+    result_lines.append("\n| " + " | ".join(result["columns"]) + " |")
+    result_lines.append("| " + " | ".join(["---" for _ in result["columns"]]) + " |")
+    for row in result["rows"]:
+        cells = []
+        for value in row:
+            if isinstance(value, float):
+                cells.append(f"{value:,.4g}" if abs(value) < 1 else f"{value:,.2f}")
+            else:
+                cells.append(str(value).replace("|", "\\|") if value is not None else "")
+        result_lines.append("| " + " | ".join(cells) + " |")
+    
+    return "\n".join(result_lines)
+
+@tool_cache.cached(version=get_excel_index_version)
+def describe_excel_data(filename: str, sheet_name: str) -> str:
+    """
+    Describe every column of a sheet using the statistics stored in the index.
+    
+    This tool answers questions about ranges, typical values and data quality
+    (e.g. "what's the range of asking rents") without reading the sheet.
+    
+    Args:
+        filename: The name of the Excel file
+        sheet_name: The name of the sheet within the file
         
-        # Add rows
-        for row in sheet_data:
-            row_values = []
-            for col in columns:
-                value = row.get(col, "")
-                # Format the value for better readability
-                if isinstance(value, (int, float)):
-                    row_values.append(str(value))
-                else:
-                    # Truncate long strings and escape pipe characters
-                    str_value = str(value).replace("|", "\\|")
-                    if len(str_value) > 50:
-                        str_value = str_value[:47] + "..."
-                    row_values.append(str_value)
-            
-            result.append("| " + " | ".join(row_values) + " |")
+    Returns:
+        One line per column with its type, null count, range, mean, distinct
+        count and most frequent values.
+    """
+    description = describe_excel_sheet(filename, sheet_name)
+    if description is None:
+        return f"No data found or unable to describe sheet '{sheet_name}' in file '{filename}'."
+    if not description["columns"]:
+        return f"No column statistics available for sheet '{sheet_name}' in file '{filename}': {description['note']}."
+    
+    result = [f"Column statistics for sheet '{sheet_name}' in file '{filename}' ({description['row_count']} rows):"]
+    for column in description["columns"]:
+        parts = [f"{column['dtype']}", f"{column['nulls']} nulls", f"~{column['distinct']} distinct"]
+        if column["min"] is not None:
+            parts.append(f"range {column['min']} to {column['max']}")
+        if column["mean"] is not None:
+            parts.append(f"mean {column['mean']:,.2f}")
+        if column["top_values"]:
+            top = ", ".join(f"{item['value']} ({item['count']})" for item in column["top_values"])
+            parts.append(f"top: {top}")
+        result.append(f"- {column['name']}: " + "; ".join(parts))
+    
+    return "\n".join(result)
+
+@tool_cache.cached(version=get_excel_index_version)
+def find_excel_column_names(query: str, kind: Optional[str] = None) -> str:
+    """
+    Find the exact spelling of a column or sheet name across all Excel files.
+    
+    Matching ignores case, spacing and punctuation and tolerates small
+    misspellings, so "Cap Rate", "cap_rate" and "CapRate" all find each other.
+    
+    Args:
+        query: The approximate column or sheet name
+        kind: Optionally "column" or "sheet" to restrict the matches
+        
+    Returns:
+        The closest names, best first, with the files and sheets containing them.
+    """
+    matches = find_excel_columns(query, max_results=10, kind=kind)
+    if not matches:
+        return f"No column or sheet names similar to '{query}' were found."
+    
+    result = [f"Names similar to '{query}':"]
+    for match in matches:
+        locations = match["locations"]
+        where = ", ".join(f"{loc['filename']} / {loc['sheet']}" for loc in locations[:3])
+        if len(locations) > 3:
+            where += f" and {len(locations) - 3} more"
+        result.append(f"- {match['kind']} '{match['name']}' (similarity {match['score']:.2f}) in {where}")
     
     return "\n".join(result)
 
@@ -204,9 +393,10 @@ def refresh_excel_index() -> str:
     Returns:
         A message indicating the result of the refresh operation.
     """
-    # Call the actual refresh function and get the changes as JSON
-    changes_json = refresh_excel_index_impl()
-    changes = json.loads(changes_json)
+    # Call the actual refresh function and get the changes
+    changes = refresh_excel_index_impl()
+    if any(changes.get(kind) for kind in ("added", "updated", "removed")):
+        tool_cache.clear()
     
     # Format the response
     result = ["Excel file index has been refreshed."]
@@ -230,9 +420,7 @@ def refresh_excel_index() -> str:
         result.append("\nNo changes detected. Index is up to date.")
     
     # Get total count
-    files_info_json = get_excel_files_info()
-    files_info = json.loads(files_info_json)
-    total_files = len(files_info) - 1 if "_changes" in files_info else len(files_info)
-    result.append(f"\nTotal files indexed: {total_files}")
+    files_info = get_excel_files_info(include_changes=False)
+    result.append(f"\nTotal files indexed: {len(files_info)}")
     
     return "\n".join(result) 
\ No newline at end of file
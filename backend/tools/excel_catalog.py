@@ -0,0 +1,302 @@
+"""
+SQLite catalog of indexed Excel files.
+
+The catalog holds one row per workbook and one row per sheet, so a change to a
+single workbook is a single upsert and metadata for one file can be read without
+touching the rest. The database runs in WAL mode, which lets several processes
+read while one writes. Every change to a file entry bumps a version number in
+the meta table, so other processes can tell cheaply whether to reload.
+"""
+
+import os
+import json
+import sqlite3
+import traceback
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+
+# Path of the SQLite catalog database
+CATALOG_PATH = os.path.join(os.getcwd(), "uploads", "excel_index.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    filename TEXT PRIMARY KEY,
+    filepath TEXT NOT NULL,
+    modified_time REAL NOT NULL,
+    file_hash TEXT NOT NULL,
+    sheets TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sheets (
+    filename TEXT NOT NULL REFERENCES files(filename) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    sheet_name TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    column_names TEXT NOT NULL,
+    preview TEXT NOT NULL,
+    profile TEXT,
+    PRIMARY KEY (filename, sheet_name)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Columns added to existing catalogs after their creation
+SHEET_COLUMN_MIGRATIONS = {
+    "profile": "ALTER TABLE sheets ADD COLUMN profile TEXT",
+}
+
+
+class ExcelCatalog:
+    """Per-file storage of Excel index entries in SQLite"""
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, creating the schema on first use"""
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(sheets)")}
+                for column, statement in SHEET_COLUMN_MIGRATIONS.items():
+                    if column not in existing:
+                        conn.execute(statement)
+                self._initialized = True
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def exists(self) -> bool:
+        """Check whether the catalog database file exists"""
+        return os.path.exists(self.path)
+
+    def is_empty(self) -> bool:
+        """Check whether the catalog holds no files"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 0
+
+    def get_version(self) -> int:
+        """Return the catalog version, which changes whenever a file entry changes"""
+        with self._connect() as conn:
+            return self._read_version(conn)
+
+    def load_snapshot(self, include_preview: bool = False) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+        """
+        Load every file entry together with the catalog version they belong to,
+        read in a single transaction so the two are consistent
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            version = self._read_version(conn)
+            entries = self._load_entries(conn, include_preview)
+        return version, entries
+
+    def load_all(self, include_preview: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Load every file entry.
+
+        Args:
+            include_preview: Whether to deserialise preview rows; when False the
+                entries carry preview=None and previews are loaded per file
+
+        Returns:
+            Mapping of filename to an entry dictionary
+        """
+        with self._connect() as conn:
+            return self._load_entries(conn, include_preview)
+
+    def _load_entries(self, conn, include_preview: bool) -> Dict[str, Dict[str, Any]]:
+        file_rows = conn.execute(
+            "SELECT filename, filepath, modified_time, file_hash, sheets FROM files"
+        ).fetchall()
+        preview_sql = "preview" if include_preview else "NULL"
+        sheet_rows = conn.execute(
+            f"SELECT filename, sheet_name, row_count, column_names, {preview_sql} "
+            "FROM sheets ORDER BY filename, position"
+        ).fetchall()
+
+        entries = {row[0]: self._file_entry(row, include_preview) for row in file_rows}
+        for filename, sheet_name, row_count, column_names, preview in sheet_rows:
+            entry = entries.get(filename)
+            if entry is not None:
+                self._add_sheet(entry, sheet_name, row_count, column_names, preview)
+        return entries
+
+    def load_file(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Load the full entry, including previews, for a single file"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT filename, filepath, modified_time, file_hash, sheets FROM files WHERE filename = ?",
+                (filename,)
+            ).fetchone()
+            if row is None:
+                return None
+            sheet_rows = conn.execute(
+                "SELECT sheet_name, row_count, column_names, preview FROM sheets "
+                "WHERE filename = ? ORDER BY position",
+                (filename,)
+            ).fetchall()
+
+        entry = self._file_entry(row, include_preview=True)
+        for sheet_name, row_count, column_names, preview in sheet_rows:
+            self._add_sheet(entry, sheet_name, row_count, column_names, preview)
+        return entry
+
+    def load_preview(self, filename: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Load only the preview rows of a single file"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT sheet_name, preview FROM sheets WHERE filename = ? ORDER BY position",
+                (filename,)
+            ).fetchall()
+        return {sheet_name: json.loads(preview) for sheet_name, preview in rows}
+
+    def load_preview_json(self, filename: str) -> Dict[str, str]:
+        """Load the preview rows of a single file as stored JSON text, without decoding them"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT sheet_name, preview FROM sheets WHERE filename = ? ORDER BY position",
+                (filename,)
+            ).fetchall()
+        return dict(rows)
+
+    def load_profile(self, filename: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Load the column profiles of a single file; sheets without a profile are left out"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT sheet_name, profile FROM sheets WHERE filename = ? AND profile IS NOT NULL "
+                "ORDER BY position",
+                (filename,)
+            ).fetchall()
+        return {sheet_name: json.loads(profile) for sheet_name, profile in rows}
+
+    def set_profile(self, filename: str, sheet_name: str, profile: List[Dict[str, Any]]) -> None:
+        """Store the column profile of one sheet"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sheets SET profile = ? WHERE filename = ? AND sheet_name = ?",
+                (json.dumps(profile, default=str), filename, sheet_name)
+            )
+
+    def upsert_file(self, entry: Dict[str, Any]) -> None:
+        """Insert or replace one file entry and its sheets"""
+        filename = entry["filename"]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO files (filename, filepath, modified_time, file_hash, sheets) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(filename) DO UPDATE SET filepath = excluded.filepath, "
+                "modified_time = excluded.modified_time, file_hash = excluded.file_hash, "
+                "sheets = excluded.sheets",
+                (filename, entry["filepath"], entry["modified_time"], entry["file_hash"],
+                 json.dumps(entry["sheets"]))
+            )
+            conn.execute("DELETE FROM sheets WHERE filename = ?", (filename,))
+            preview = entry.get("preview") or {}
+            profile = entry.get("profile") or {}
+            conn.executemany(
+                "INSERT INTO sheets (filename, position, sheet_name, row_count, column_names, preview, profile) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (filename, position, sheet, entry["row_count"].get(sheet, 0),
+                     json.dumps(entry["column_names"].get(sheet, [])),
+                     json.dumps(preview.get(sheet, []), default=str),
+                     json.dumps(profile[sheet], default=str) if sheet in profile else None)
+                    for position, sheet in enumerate(entry["sheets"])
+                ]
+            )
+            self._bump_version(conn)
+
+    def delete_file(self, filename: str) -> None:
+        """Remove one file entry and its sheets"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files WHERE filename = ?", (filename,))
+            self._bump_version(conn)
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Read a catalog-level setting"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: Any) -> None:
+        """Write a catalog-level setting"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, str(value))
+            )
+
+    def migrate_json(self, json_path: str) -> bool:
+        """
+        Import a legacy excel_index.json into the catalog.
+
+        The JSON file is left in place; it is only imported into an empty
+        catalog, so it is not imported again.
+
+        Returns:
+            True if the JSON index was imported
+        """
+        if not os.path.exists(json_path):
+            return False
+        try:
+            with open(json_path, "r") as f:
+                index_data = json.load(f)
+            for file_data in index_data.get("files", {}).values():
+                self.upsert_file(file_data)
+            self.set_meta("last_refresh_time", index_data.get("last_refresh_time", 0))
+            print(f"Migrated {len(index_data.get('files', {}))} Excel files from {json_path} to {self.path}")
+            return True
+        except Exception as e:
+            print(f"Error migrating legacy index {json_path}: {str(e)}")
+            traceback.print_exc()
+            return False
+
+    @staticmethod
+    def _read_version(conn) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    @staticmethod
+    def _bump_version(conn) -> None:
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    @staticmethod
+    def _file_entry(row, include_preview: bool) -> Dict[str, Any]:
+        filename, filepath, modified_time, file_hash, sheets = row
+        return {
+            "filename": filename,
+            "filepath": filepath,
+            "sheets": json.loads(sheets),
+            "row_count": {},
+            "column_names": {},
+            "preview": {} if include_preview else None,
+            "modified_time": modified_time,
+            "file_hash": file_hash,
+        }
+
+    @staticmethod
+    def _add_sheet(entry: Dict[str, Any], sheet_name: str, row_count: int,
+                   column_names: str, preview: Optional[str]) -> None:
+        entry["row_count"][sheet_name] = row_count
+        entry["column_names"][sheet_name] = json.loads(column_names)
+        if entry["preview"] is not None and preview is not None:
+            entry["preview"][sheet_name] = json.loads(preview)
@@ -0,0 +1,125 @@
+"""
+Columnar JSON serialisation for Excel data.
+
+Sheet pages, streamed chunks and aggregate tables are encoded straight from the
+DataFrame by pandas' C JSON encoder, column type by column type, instead of
+converting every cell to a Python object first. Small envelopes around the
+encoded rows are assembled as bytes, so an HTTP response is produced without
+building, parsing and re-encoding intermediate JSON strings.
+"""
+
+import json
+from datetime import date, datetime, time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Options shared by every DataFrame encoding: ISO dates without fractional seconds
+# (matching datetime.isoformat() for whole seconds), NaN/NaT as null, and str()
+# for anything the encoder does not know
+FRAME_JSON_OPTIONS = {
+    "date_format": "iso",
+    "date_unit": "s",
+    "default_handler": str,
+    "force_ascii": False,
+}
+
+
+class RawJSON(bytes):
+    """Already-encoded JSON, spliced verbatim into an envelope by json_object"""
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (pd.Timestamp, datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode a small Python value as compact JSON bytes"""
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_object(fields: Dict[str, Any]) -> bytes:
+    """Encode a JSON object whose RawJSON values are inserted without re-encoding"""
+    parts = []
+    for key, value in fields.items():
+        encoded = value if isinstance(value, RawJSON) else dumps(value)
+        parts.append(dumps(str(key)) + b":" + encoded)
+    return b"{" + b",".join(parts) + b"}"
+
+
+def records_json(df: pd.DataFrame) -> RawJSON:
+    """Encode a frame as a JSON array of row objects"""
+    return RawJSON(df.to_json(orient="records", **FRAME_JSON_OPTIONS).encode("utf-8"))
+
+
+def values_json(df: pd.DataFrame) -> RawJSON:
+    """Encode a frame as a JSON array of row arrays (column names are sent separately)"""
+    return RawJSON(df.to_json(orient="values", **FRAME_JSON_OPTIONS).encode("utf-8"))
+
+
+def ndjson(df: pd.DataFrame) -> bytes:
+    """Encode a frame as newline-delimited JSON, one row object per line"""
+    if df.empty:
+        return b""
+    text = df.to_json(orient="records", lines=True, **FRAME_JSON_OPTIONS)
+    return text.encode("utf-8") if text.endswith("\n") else (text + "\n").encode("utf-8")
+
+
+def format_column(series: pd.Series, max_width: int = 50, escape_pipes: bool = True) -> np.ndarray:
+    """
+    Convert one column to display strings in a single vectorised pass.
+
+    Args:
+        series: The column to convert
+        max_width: Text longer than this is truncated with "..."
+        escape_pipes: Escape "|" so the strings can be used in markdown tables
+
+    Returns:
+        An object array of strings, with "" for missing values
+    """
+    missing = series.isna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        text = series.dt.strftime("%Y-%m-%dT%H:%M:%S")
+    elif pd.api.types.is_float_dtype(series.dtype):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        with np.errstate(invalid="ignore"):
+            integral = np.isfinite(values) & (np.mod(values, 1) == 0) & (np.abs(values) < 2 ** 53)
+        text = values.astype(str).astype(object)
+        if integral.any():
+            text[integral] = values[integral].astype(np.int64).astype(str)
+        text = pd.Series(text, index=series.index)
+    elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        text = series.astype(str)
+    else:
+        text = series.map(lambda v: v.isoformat() if isinstance(v, (datetime, date, time)) else str(v))
+        # Line breaks and tabs would split a row of text output
+        text = text.str.replace(r"[\r\n\t]+", " ", regex=True)
+        if escape_pipes:
+            text = text.str.replace("|", "\\|", regex=False)
+        long_values = text.str.len() > max_width
+        if long_values.any():
+            text = text.where(~long_values, text.str.slice(0, max_width - 3) + "...")
+    text = text.to_numpy(dtype=object)
+    text[missing] = ""
+    return text
+
+
+def format_cells(df: pd.DataFrame, max_width: int = 50) -> List[List[str]]:
+    """
+    Render a frame as display strings, converting column by column.
+
+    Integral floats are shown without a trailing .0, dates in ISO format,
+    missing values as empty strings, and long text is truncated to max_width.
+
+    Returns:
+        One list of cell strings per row
+    """
+    if df.empty:
+        return []
+    columns = [format_column(df.iloc[:, i], max_width).tolist() for i in range(df.shape[1])]
+    return [list(row) for row in zip(*columns)]
@@ -0,0 +1,206 @@
+"""
+Per-column statistics profiles for Excel sheets.
+
+Profiles are accumulated cell by cell during the single streaming scan that
+indexes a workbook, so they cost no extra pass over the file. Each column keeps
+bounded state: running numeric aggregates, a HyperLogLog sketch for the
+distinct count, and a Misra-Gries summary for the most frequent values. Until a
+column has more distinct values than the summary holds, both are exact.
+"""
+
+import math
+import hashlib
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional
+
+from tools.excel_search import cell_text
+
+# Number of most frequent values reported per column
+TOP_K = 5
+# HyperLogLog precision: 2**HLL_PRECISION registers, ~1.6% standard error at 12
+HLL_PRECISION = 12
+
+
+
+class HyperLogLog:
+    """Distinct-count estimator with fixed memory"""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+        self._rank_bits = 64 - precision
+        self._rank_mask = (1 << self._rank_bits) - 1
+
+    def add(self, value: str) -> None:
+        # A stable hash: the builtin one is salted per process, so registers built
+        # by different processes (pool workers, server workers) would not agree
+        h = int.from_bytes(hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "big")
+        idx = h >> self._rank_bits
+        rank = self._rank_bits - (h & self._rank_mask).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def estimate(self) -> int:
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class ColumnProfiler:
+    """Accumulate statistics for one column"""
+
+    def __init__(self, top_k: int = TOP_K):
+        self.top_k = top_k
+        # Misra-Gries keeps counters for at most this many candidate values
+        self._capacity = max(top_k * 200, 1000)
+        self._pruned = False
+        self.count = 0
+        self.types: Dict[str, int] = {}
+        self.numeric_count = 0
+        self.numeric_sum = 0.0
+        self.numeric_min: Optional[float] = None
+        self.numeric_max: Optional[float] = None
+        self.date_min: Optional[datetime] = None
+        self.date_max: Optional[datetime] = None
+        self.text_min: Optional[str] = None
+        self.text_max: Optional[str] = None
+        self.distinct = HyperLogLog()
+        self.frequent: Dict[str, int] = {}
+
+    def add(self, value: Any) -> None:
+        """Add one non-empty cell value"""
+        text = cell_text(value)
+        if text is None:
+            return
+        self.count += 1
+
+        if isinstance(value, bool):
+            kind = "boolean"
+        elif isinstance(value, (int, float)):
+            kind = "integer" if isinstance(value, int) or float(value).is_integer() else "float"
+            number = float(value)
+            self.numeric_count += 1
+            self.numeric_sum += number
+            if self.numeric_min is None or number < self.numeric_min:
+                self.numeric_min = number
+            if self.numeric_max is None or number > self.numeric_max:
+                self.numeric_max = number
+        elif isinstance(value, (datetime, date)):
+            kind = "datetime"
+            if not isinstance(value, datetime):
+                value = datetime(value.year, value.month, value.day)
+            if self.date_min is None or value < self.date_min:
+                self.date_min = value
+            if self.date_max is None or value > self.date_max:
+                self.date_max = value
+        elif isinstance(value, time):
+            kind = "time"
+        else:
+            kind = "string"
+            if self.text_min is None or text < self.text_min:
+                self.text_min = text
+            if self.text_max is None or text > self.text_max:
+                self.text_max = text
+        self.types[kind] = self.types.get(kind, 0) + 1
+
+        if self._pruned:
+            self.distinct.add(text)
+        frequent = self.frequent
+        frequent[text] = frequent.get(text, 0) + 1
+        if len(frequent) > 2 * self._capacity:
+            self._prune()
+
+    def _prune(self) -> None:
+        # Misra-Gries step, batched: subtract the (capacity+1)-th largest count from
+        # every counter and drop those that reach zero
+        if not self._pruned:
+            # Until now the counters held every distinct value; seed the sketch with them
+            for value in self.frequent:
+                self.distinct.add(value)
+            self._pruned = True
+        cutoff = sorted(self.frequent.values(), reverse=True)[self._capacity]
+        self.frequent = {value: count - cutoff for value, count in self.frequent.items() if count > cutoff}
+
+    def dtype(self) -> str:
+        """Infer the column type from the cell types seen"""
+        kinds = set(self.types)
+        if not kinds:
+            return "empty"
+        if kinds == {"integer"}:
+            return "integer"
+        if kinds <= {"integer", "float"}:
+            return "float"
+        if len(kinds) == 1:
+            return kinds.pop()
+        return "mixed"
+
+    def to_dict(self, name: str, row_count: int) -> Dict[str, Any]:
+        """Summarise the column"""
+        profile: Dict[str, Any] = {
+            "name": name,
+            "dtype": self.dtype(),
+            "count": self.count,
+            "nulls": max(row_count - self.count, 0),
+            # Exact while every distinct value still has its own counter
+            "distinct": min(self.distinct.estimate(), self.count) if self._pruned else len(self.frequent),
+            "min": None,
+            "max": None,
+            "mean": None,
+        }
+        if self.numeric_count:
+            profile["min"] = _plain_number(self.numeric_min)
+            profile["max"] = _plain_number(self.numeric_max)
+            profile["mean"] = round(self.numeric_sum / self.numeric_count, 6)
+        elif self.date_min is not None:
+            profile["min"] = self.date_min.isoformat()
+            profile["max"] = self.date_max.isoformat()
+        elif self.text_min is not None:
+            profile["min"] = self.text_min
+            profile["max"] = self.text_max
+        top = sorted(self.frequent.items(), key=lambda item: (-item[1], item[0]))[:self.top_k]
+        # Values seen only once are not "top" values
+        profile["top_values"] = [{"value": value, "count": count} for value, count in top if count > 1]
+        return profile
+
+
+def _plain_number(value: Optional[float]) -> Any:
+    if value is not None and value.is_integer():
+        return int(value)
+    return value
+
+
+class SheetProfiler:
+    """Accumulate column profiles for one sheet, indexed by column position"""
+
+    def __init__(self):
+        self.columns: Dict[int, ColumnProfiler] = {}
+
+    def add(self, col_idx: int, value: Any) -> None:
+        profiler = self.columns.get(col_idx)
+        if profiler is None:
+            profiler = self.columns[col_idx] = ColumnProfiler()
+        profiler.add(value)
+
+    def build(self, column_names: List[str], row_count: int) -> List[Dict[str, Any]]:
+        """Return one profile per column, in column order"""
+        empty = ColumnProfiler()
+        return [
+            self.columns.get(col_idx, empty).to_dict(name, row_count)
+            for col_idx, name in enumerate(column_names)
+        ]
+
+
+def profile_frame(df) -> List[Dict[str, Any]]:
+    """Profile an already parsed sheet (used for entries indexed before profiles existed)"""
+    profiler = SheetProfiler()
+    for col_idx in range(df.shape[1]):
+        for value in df.iloc[:, col_idx].tolist():
+            if value is not None:
+                profiler.add(col_idx, value.to_pydatetime() if hasattr(value, "to_pydatetime") else value)
+    return profiler.build([str(col) for col in df.columns], len(df))
@@ -0,0 +1,451 @@
+"""
+Full-content inverted index over Excel workbooks.
+
+Every cell of every sheet is tokenised at index time. Each workbook gets its own
+term index (term -> cell postings), persisted next to the other Excel caches so
+it only has to be rebuilt when the file changes. Across workbooks a global term
+dictionary and a trigram index over the vocabulary let queries find matching
+terms, including substrings, without scanning any cell data. A separate
+trigram index over sheet and column names resolves approximate name lookups.
+"""
+
+import os
+import re
+import math
+import heapq
+import pickle
+import hashlib
+import traceback
+from datetime import datetime
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Base directory where per-file term indexes are stored
+SEARCH_INDEX_DIR = os.path.join(os.getcwd(), "uploads", "search_index")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.'/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def trigrams(term: str) -> Set[str]:
+    """Return the set of character trigrams of a term"""
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def cell_text(value: Any) -> Optional[str]:
+    """Render a cell value the way it is shown to users, or None for empty cells"""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if value.is_integer():
+            return str(int(value))
+    if value is pd.NaT:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    text = str(value).strip()
+    return text or None
+
+
+@dataclass
+class FileTermIndex:
+    """Term index for a single workbook"""
+    fingerprint: str
+    sheets: List[str]
+    columns: List[List[str]]
+    values: List[str]
+    # term -> int32 array of (sheet index, row, column index, value id) postings
+    postings: Dict[str, np.ndarray]
+    cell_count: int = 0
+
+
+class TermIndexBuilder:
+    """Accumulate cell postings for one workbook"""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.sheets: List[str] = []
+        self.columns: List[List[str]] = []
+        self.values: List[str] = []
+        self.cell_count = 0
+        self._value_ids: Dict[str, int] = {}
+        self._value_terms: List[List[str]] = []
+        self._postings: Dict[str, List[int]] = {}
+
+    def add_sheet(self, sheet_name: str, columns: Optional[List[str]] = None) -> int:
+        """Register a sheet and return its index"""
+        self.sheets.append(sheet_name)
+        self.columns.append([str(col) for col in columns or []])
+        return len(self.sheets) - 1
+
+    def set_columns(self, sheet_idx: int, columns: List[str]) -> None:
+        """Set column names of a sheet once they are known (after a streaming scan)"""
+        self.columns[sheet_idx] = [str(col) for col in columns]
+
+    def _value_id(self, text: str) -> int:
+        value_id = self._value_ids.get(text)
+        if value_id is None:
+            value_id = len(self.values)
+            self._value_ids[text] = value_id
+            self.values.append(text)
+            # Deduplicate terms so a value repeating a word is posted once per cell
+            self._value_terms.append(list(dict.fromkeys(tokenize(text))))
+        return value_id
+
+    def add_cell(self, sheet_idx: int, row: int, col_idx: int, value: Any) -> None:
+        """Add a single cell; empty cells are skipped"""
+        text = cell_text(value)
+        if text is None:
+            return
+        value_id = self._value_id(text)
+        self.cell_count += 1
+        for term in self._value_terms[value_id]:
+            self._postings.setdefault(term, []).extend((sheet_idx, row, col_idx, value_id))
+
+    def build(self) -> FileTermIndex:
+        """Freeze the accumulated postings into compact arrays"""
+        postings = {
+            term: np.asarray(flat, dtype=np.int32).reshape(-1, 4)
+            for term, flat in self._postings.items()
+        }
+        return FileTermIndex(
+            fingerprint=self.fingerprint,
+            sheets=self.sheets,
+            columns=self.columns,
+            values=self.values,
+            postings=postings,
+            cell_count=self.cell_count,
+        )
+
+
+class SearchIndex:
+    """Inverted index across all workbooks, updated one file at a time"""
+
+    def __init__(self, index_dir: str = SEARCH_INDEX_DIR):
+        self.index_dir = index_dir
+        self.files: Dict[str, FileTermIndex] = {}
+        # Global vocabulary: term -> files containing it, and total postings per term
+        self.term_files: Dict[str, Set[str]] = {}
+        self.term_counts: Dict[str, int] = {}
+        self.total_postings = 0
+        # Trigram -> terms, used to resolve substring queries against the vocabulary
+        self.trigram_terms: Dict[str, Set[str]] = {}
+
+    def _path(self, filename: str) -> str:
+        digest = hashlib.md5(filename.encode("utf-8")).hexdigest()
+        return os.path.join(self.index_dir, f"{digest}.pkl")
+
+    def has(self, filename: str, fingerprint: str) -> bool:
+        """Check whether an up-to-date term index is loaded for a file"""
+        entry = self.files.get(filename)
+        return entry is not None and entry.fingerprint == fingerprint
+
+    def load(self, filename: str, fingerprint: str) -> bool:
+        """Load a persisted term index if it matches the given fingerprint"""
+        if self.has(filename, fingerprint):
+            return True
+        path = self._path(filename)
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            if entry.fingerprint != fingerprint:
+                return False
+            self._add(filename, entry)
+            return True
+        except Exception as e:
+            print(f"Error loading search index for {filename}: {str(e)}")
+            return False
+
+    def update(self, filename: str, entry: FileTermIndex) -> None:
+        """Replace the term index for one file and persist it"""
+        self.remove(filename, delete_file=False)
+        self._add(filename, entry)
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            tmp_path = f"{self._path(filename)}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(filename))
+        except Exception as e:
+            print(f"Error saving search index for {filename}: {str(e)}")
+            traceback.print_exc()
+
+    def remove(self, filename: str, delete_file: bool = True) -> None:
+        """Drop a file from the index"""
+        entry = self.files.pop(filename, None)
+        if entry is not None:
+            for term, postings in entry.postings.items():
+                self.term_counts[term] -= len(postings)
+                self.total_postings -= len(postings)
+                owners = self.term_files.get(term)
+                if owners is None:
+                    continue
+                owners.discard(filename)
+                if not owners:
+                    del self.term_files[term]
+                    del self.term_counts[term]
+                    for gram in trigrams(term):
+                        terms = self.trigram_terms.get(gram)
+                        if terms is not None:
+                            terms.discard(term)
+                            if not terms:
+                                del self.trigram_terms[gram]
+        if delete_file and os.path.exists(self._path(filename)):
+            try:
+                os.remove(self._path(filename))
+            except Exception as e:
+                print(f"Error removing search index for {filename}: {str(e)}")
+
+    def _add(self, filename: str, entry: FileTermIndex) -> None:
+        self.files[filename] = entry
+        for term, postings in entry.postings.items():
+            owners = self.term_files.get(term)
+            if owners is None:
+                owners = self.term_files[term] = set()
+                self.term_counts[term] = 0
+                for gram in trigrams(term):
+                    self.trigram_terms.setdefault(gram, set()).add(term)
+            owners.add(filename)
+            self.term_counts[term] += len(postings)
+            self.total_postings += len(postings)
+
+    def _matching_terms(self, token: str) -> Dict[str, float]:
+        """Vocabulary terms matching a query token, weighted by match quality"""
+        matches: Dict[str, float] = {}
+        if token in self.term_files:
+            matches[token] = 1.0
+        grams = trigrams(token)
+        if not grams:
+            return matches
+        # Intersect the smallest trigram sets first, then verify real substrings
+        candidate_sets = sorted((self.trigram_terms.get(g, set()) for g in grams), key=len)
+        candidates = set(candidate_sets[0])
+        for terms in candidate_sets[1:]:
+            candidates &= terms
+            if not candidates:
+                break
+        for term in candidates:
+            if term != token and token in term:
+                matches[term] = 0.5 if term.startswith(token) else 0.3
+        return matches
+
+    def search(self, query: str, max_results: int = 100) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Find cells matching all terms of a query.
+
+        Files share max_results round-robin: every matching file contributes its
+        best hit before any file contributes a second one, and so on, so one file
+        with many equally scored matches cannot crowd out the others.
+
+        Args:
+            query: Free-text query
+            max_results: Maximum number of cell hits to return
+
+        Returns:
+            (hits, matches): the cell hits, each with filename, sheet, row, column,
+            value and score, ordered by rank within their file and then by
+            relevance; and the total number of matching cells per file
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return [], {}
+
+        token_terms = [self._matching_terms(token) for token in tokens]
+        if any(not terms for terms in token_terms):
+            return [], {}
+
+        # Only files containing a candidate term for every token can match
+        candidate_files: Optional[Set[str]] = None
+        for terms in token_terms:
+            files: Set[str] = set()
+            for term in terms:
+                files |= self.term_files.get(term, set())
+            candidate_files = files if candidate_files is None else candidate_files & files
+
+        phrase = query.strip().lower()
+        hits: List[Tuple[int, float, str, int, int, int, int]] = []
+        matches: Dict[str, int] = {}
+        for filename in sorted(candidate_files or ()):
+            entry = self.files[filename]
+            cell_scores: Optional[Dict[Tuple[int, int, int], float]] = None
+            cell_values: Dict[Tuple[int, int, int], int] = {}
+            for terms in token_terms:
+                token_scores: Dict[Tuple[int, int, int], float] = {}
+                for term, weight in terms.items():
+                    postings = entry.postings.get(term)
+                    if postings is None:
+                        continue
+                    idf = math.log(1 + self.total_postings / self.term_counts[term])
+                    for sheet_idx, row, col_idx, value_id in postings.tolist():
+                        key = (sheet_idx, row, col_idx)
+                        score = weight * idf
+                        if score > token_scores.get(key, 0.0):
+                            token_scores[key] = score
+                        cell_values[key] = value_id
+                if cell_scores is None:
+                    cell_scores = token_scores
+                else:
+                    cell_scores = {
+                        key: score + token_scores[key]
+                        for key, score in cell_scores.items() if key in token_scores
+                    }
+                if not cell_scores:
+                    break
+
+            file_hits = []
+            for key, score in (cell_scores or {}).items():
+                value_id = cell_values[key]
+                value = entry.values[value_id]
+                lowered = value.lower()
+                if lowered == phrase:
+                    score *= 2.0
+                elif phrase in lowered:
+                    score *= 1.5
+                file_hits.append((score, key[0], key[1], key[2], value_id))
+            if not file_hits:
+                continue
+            matches[filename] = len(file_hits)
+            # No file can contribute more than max_results hits
+            file_hits = heapq.nsmallest(max_results, file_hits, key=lambda hit: (-hit[0], hit[1], hit[2], hit[3]))
+            hits.extend((rank, score, filename, sheet_idx, row, col_idx, value_id)
+                        for rank, (score, sheet_idx, row, col_idx, value_id) in enumerate(file_hits))
+
+        # Each file's best hit first, then each file's second best, ...
+        hits.sort(key=lambda hit: (hit[0], -hit[1], hit[2]))
+        results = []
+        for _, score, filename, sheet_idx, row, col_idx, value_id in hits[:max_results]:
+            entry = self.files[filename]
+            results.append({
+                "filename": filename,
+                "sheet": entry.sheets[sheet_idx],
+                "row": row,
+                "column": entry.columns[sheet_idx][col_idx],
+                "value": entry.values[value_id],
+                "score": round(score, 4),
+            })
+        return results, matches
+
+
+def normalize_name(name: str) -> str:
+    """Reduce a column or sheet name to lowercase letters and digits ("Cap_Rate %" -> "caprate")"""
+    return "".join(c for c in str(name).lower() if c.isalnum())
+
+
+class NameIndex:
+    """
+    Trigram index over the column and sheet names of all workbooks.
+
+    Names are normalised before indexing, so spacing, punctuation and case do not
+    matter, and ranked by trigram (Dice) similarity. Identical names from many
+    files share one entry, and files are added and removed one at a time.
+    """
+
+    def __init__(self):
+        # (kind, name) -> owners: filename -> sheets containing the name
+        self.owners: Dict[Tuple[str, str], Dict[str, List[str]]] = {}
+        self.grams: Dict[Tuple[str, str], Set[str]] = {}
+        self.gram_names: Dict[str, Set[Tuple[str, str]]] = {}
+        self.file_names: Dict[str, Set[Tuple[str, str]]] = {}
+
+    @staticmethod
+    def _grams(name: str) -> Set[str]:
+        normalized = normalize_name(name)
+        return trigrams(f"^{normalized}$") if normalized else set()
+
+    def update_file(self, filename: str, column_names: Dict[str, List[str]]) -> None:
+        """Index (or re-index) the sheet and column names of one file"""
+        self.remove_file(filename)
+        keys = set()
+        for sheet, columns in column_names.items():
+            for kind, name in [("sheet", sheet)] + [("column", column) for column in columns]:
+                key = (kind, str(name))
+                keys.add(key)
+                owners = self.owners.get(key)
+                if owners is None:
+                    owners = self.owners[key] = {}
+                    grams = self.grams[key] = self._grams(key[1])
+                    for gram in grams:
+                        self.gram_names.setdefault(gram, set()).add(key)
+                owners.setdefault(filename, [])
+                if sheet not in owners[filename]:
+                    owners[filename].append(sheet)
+        self.file_names[filename] = keys
+
+    def remove_file(self, filename: str) -> None:
+        """Drop the names of one file"""
+        for key in self.file_names.pop(filename, set()):
+            owners = self.owners.get(key)
+            if owners is None:
+                continue
+            owners.pop(filename, None)
+            if owners:
+                continue
+            del self.owners[key]
+            for gram in self.grams.pop(key, set()):
+                names = self.gram_names.get(gram)
+                if names is not None:
+                    names.discard(key)
+                    if not names:
+                        del self.gram_names[gram]
+
+    def search(self, query: str, max_results: int = 10, kind: Optional[str] = None,
+               min_score: float = 0.3) -> List[Dict[str, Any]]:
+        """
+        Rank names by similarity to a query
+
+        Args:
+            query: The (possibly misspelled or differently formatted) name
+            max_results: Maximum number of names to return
+            kind: Only return "column" or "sheet" names
+            min_score: Minimum similarity between 0 and 1
+
+        Returns:
+            Matches sorted by descending score, each with name, kind, score and
+            locations ({"filename", "sheet"})
+        """
+        query_grams = self._grams(query)
+        if not query_grams:
+            return []
+        normalized = normalize_name(query)
+
+        shared: Dict[Tuple[str, str], int] = {}
+        for gram in query_grams:
+            for key in self.gram_names.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+
+        scored = []
+        for key, count in shared.items():
+            if kind is not None and key[0] != kind:
+                continue
+            score = 2.0 * count / (len(query_grams) + len(self.grams[key]))
+            # A query contained in the name (e.g. "rent" in "Rent/SF/Yr") is a strong hint
+            if normalized in normalize_name(key[1]):
+                score = max(score, 0.6)
+            if score >= min_score:
+                scored.append((score, key))
+
+        scored.sort(key=lambda item: (-item[0], item[1][0], item[1][1]))
+        return [
+            {
+                "name": key[1],
+                "kind": key[0],
+                "score": round(score, 3),
+                "locations": [
+                    {"filename": filename, "sheet": sheet}
+                    for filename, sheets in sorted(self.owners[key].items())
+                    for sheet in sheets
+                ],
+            }
+            for score, key in scored[:max_results]
+        ]
@@ -0,0 +1,170 @@
+"""
+Background watcher for the Excel uploads directory.
+
+Filesystem events (inotify on Linux, through watchdog) are collected per path,
+debounced so a file that is still being written is handled once, and handed to a
+callback in a background thread. Where no native watcher is available the
+directory is polled instead, comparing modification times and sizes.
+"""
+
+import os
+import time
+import threading
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog is optional; fall back to polling
+    Observer = None
+    FileSystemEventHandler = object
+
+# "auto" uses native events when available, "poll" forces polling, "off" disables watching
+WATCH_MODE = os.getenv("EXCEL_WATCH_MODE", "auto").lower()
+# Seconds between directory scans in polling mode
+POLL_INTERVAL = float(os.getenv("EXCEL_WATCH_INTERVAL", 2))
+# Seconds a path must stay quiet before it is handed to the callback
+DEBOUNCE_SECONDS = 1.0
+
+
+def is_excel_path(path: str) -> bool:
+    """Check whether a path is an Excel workbook the index should track"""
+    name = os.path.basename(path)
+    # Skip hidden/temporary files such as in-progress uploads
+    return name.lower().endswith(".xlsx") and not name.startswith(".")
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forward file events for Excel workbooks to the watcher"""
+
+    def __init__(self, watcher: "DirectoryWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if path:
+                self.watcher.enqueue(os.fsdecode(path))
+
+
+class DirectoryWatcher:
+    """Watch a directory and report changed Excel files in batches"""
+
+    def __init__(self, directory: str, on_changes: Callable[[List[str]], None],
+                 mode: str = WATCH_MODE, poll_interval: float = POLL_INTERVAL,
+                 debounce: float = DEBOUNCE_SECONDS):
+        self.directory = directory
+        self.on_changes = on_changes
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.backend: Optional[str] = None
+        self._pending: Dict[str, float] = {}
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def running(self) -> bool:
+        return self.backend is not None and not self._stopped.is_set()
+
+    def start(self) -> bool:
+        """Start watching; returns False if watching is disabled"""
+        if self.running:
+            return True
+        if self.mode == "off":
+            return False
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._stopped.clear()
+
+        if self.mode != "poll" and Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_EventHandler(self), self.directory, recursive=False)
+                self._observer.start()
+                self.backend = type(self._observer).__name__
+            except Exception as e:
+                print(f"Native file watching unavailable ({str(e)}), falling back to polling")
+                self._observer = None
+
+        if self._observer is None:
+            self.backend = "polling"
+            self._start_thread(self._poll_loop, "excel-watch-poll")
+
+        self._start_thread(self._dispatch_loop, "excel-watch-dispatch")
+        print(f"Watching {self.directory} for Excel changes ({self.backend})")
+        return True
+
+    def stop(self) -> None:
+        """Stop watching and wait for the background threads"""
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self.backend = None
+
+    def enqueue(self, path: str) -> None:
+        """Queue a path for processing once it has been quiet for the debounce period"""
+        if not is_excel_path(path):
+            return
+        with self._condition:
+            self._pending[os.path.abspath(path)] = time.monotonic()
+            self._condition.notify()
+
+    def _start_thread(self, target, name: str) -> None:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _dispatch_loop(self) -> None:
+        while not self._stopped.is_set():
+            with self._condition:
+                while not self._pending and not self._stopped.is_set():
+                    self._condition.wait()
+                if self._stopped.is_set():
+                    return
+                now = time.monotonic()
+                due = [path for path, seen in self._pending.items() if now - seen >= self.debounce]
+                for path in due:
+                    del self._pending[path]
+                if not due:
+                    # Wake up when the oldest pending path becomes due
+                    oldest = min(self._pending.values())
+                    self._condition.wait(timeout=max(self.debounce - (now - oldest), 0.05))
+                    continue
+            try:
+                self.on_changes(due)
+            except Exception as e:
+                print(f"Error handling Excel file changes: {str(e)}")
+                traceback.print_exc()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and is_excel_path(entry.path):
+                        stat = entry.stat()
+                        snapshot[os.path.abspath(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def _poll_loop(self) -> None:
+        previous = self._snapshot()
+        while not self._stopped.wait(self.poll_interval):
+            current = self._snapshot()
+            for path in set(previous) | set(current):
+                if previous.get(path) != current.get(path):
+                    self.enqueue(path)
+            previous = current
@@ -0,0 +1,89 @@
+"""
+Advisory inter-process file lock.
+
+Used to make one process at a time the writer of a shared index when the API
+runs with several worker processes. The lock is re-entrant within a process but
+not thread-safe on its own; callers serialise their threads with a lock of
+their own before taking it.
+"""
+
+import os
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Exclusive lock on a lock file, shared between processes"""
+
+    def __init__(self, path: str, timeout: Optional[float] = None, poll_interval: float = 0.1):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._depth = 0
+
+    @property
+    def is_held(self) -> bool:
+        return self._depth > 0
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self) -> None:
+        """
+        Take the lock, waiting for other processes to release it
+
+        Raises:
+            TimeoutError: If the lock is not acquired within the timeout
+        """
+        if self._depth > 0:
+            self._depth += 1
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                raise TimeoutError(f"Timed out waiting for lock {self.path}")
+            time.sleep(self.poll_interval)
+        self._fd = fd
+        self._depth = 1
+
+    def release(self) -> None:
+        """Release one level of the lock, unlocking the file when the outermost holder releases"""
+        if self._depth == 0:
+            return
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
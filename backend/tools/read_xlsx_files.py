@@ -1,19 +1,49 @@
 import os
+import re
 import pandas as pd
 import json
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Literal, Optional, Tuple, Union
 from dataclasses import dataclass
+from contextlib import contextmanager
 import glob
 import time
+import base64
 import hashlib
 import traceback
+import zipfile
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 import numpy as np
+import openpyxl
+from pydantic import BaseModel
+
+from tools.sheet_cache import SheetCache, SHEET_CACHE_DIR
+from tools.excel_search import SearchIndex, TermIndexBuilder, FileTermIndex, NameIndex, SEARCH_INDEX_DIR, normalize_name
+from tools.excel_catalog import ExcelCatalog, CATALOG_PATH
+from tools.excel_watcher import DirectoryWatcher, is_excel_path
+from tools.file_lock import FileLock
+from tools.excel_profile import SheetProfiler, profile_frame
+from tools.excel_json import RawJSON, json_object, records_json, values_json, ndjson
 
 # Base directory where Excel files are stored
 XLSX_FILES_DIR = os.path.join(os.getcwd(), "uploads", "xlsx_files")
-# Path for the Excel index JSON file
-INDEX_FILE_PATH = os.path.join(os.getcwd(), "uploads", "excel_index.json")
+# Path for the Excel index catalog (SQLite)
+INDEX_FILE_PATH = CATALOG_PATH
+# Path of the legacy JSON index, migrated into the catalog on first load
+LEGACY_INDEX_FILE_PATH = os.path.join(os.getcwd(), "uploads", "excel_index.json")
+# Prefixes of the file fingerprints produced by _calculate_file_hash
+FINGERPRINT_PREFIXES = ("zip-", "md5-")
+# Number of worker processes used to parse changed workbooks during a refresh
+INDEX_WORKERS = int(os.getenv("EXCEL_INDEX_WORKERS", os.cpu_count() or 1))
+# Number of rows serialised at a time when streaming a sheet
+STREAM_CHUNK_ROWS = 1000
+# Prefix that addresses a virtual table (same-schema sheets across files) in place of a filename
+VIRTUAL_TABLE_PREFIX = "virtual:"
+# Column added to virtual tables naming the file each row comes from
+SOURCE_FILE_COLUMN = "Source File"
 
 # Custom JSON encoder to handle pandas Timestamp and other non-serializable types
 class CustomJSONEncoder(json.JSONEncoder):
@@ -38,9 +68,12 @@ class ExcelFileInfo:
     sheets: List[str]
     row_count: Dict[str, int]
     column_names: Dict[str, List[str]]
-    preview: Dict[str, List[Dict[str, Any]]]
+    # None until loaded: previews are read from the catalog per file on demand
+    preview: Optional[Dict[str, List[Dict[str, Any]]]]
     modified_time: float
     file_hash: str
+    # Per-column statistics by sheet; like previews, loaded from the catalog on demand
+    profile: Optional[Dict[str, List[Dict[str, Any]]]] = None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
@@ -52,7 +85,8 @@ class ExcelFileInfo:
             "column_names": self.column_names,
             "preview": self.preview,
             "modified_time": self.modified_time,
-            "file_hash": self.file_hash
+            "file_hash": self.file_hash,
+            "profile": self.profile
         }
     
     @classmethod
@@ -66,67 +100,170 @@ class ExcelFileInfo:
             column_names=data["column_names"],
             preview=data["preview"],
             modified_time=data.get("modified_time", 0),
-            file_hash=data.get("file_hash", "")
+            file_hash=data.get("file_hash", ""),
+            profile=data.get("profile")
         )
 
+@dataclass
+class VirtualTable:
+    """Sheets with identical columns in several files, queried as a single table"""
+    name: str
+    sheet: str
+    columns: List[str]
+    # (filename, sheet) of each member, newest file first
+    members: List[Tuple[str, str]]
+    # Columns identifying a record; a record found in several files is kept from the newest only
+    key: List[str]
+    fingerprint: str
+    row_count: int
+    
+    @property
+    def filename(self) -> str:
+        return VIRTUAL_TABLE_PREFIX + self.name
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization"""
+        return {
+            "filename": self.filename,
+            "sheet": self.sheet,
+            "files": [filename for filename, _ in self.members],
+            "key": self.key,
+            "row_count": self.row_count,
+            "column_names": [SOURCE_FILE_COLUMN] + self.columns
+        }
+
 class ExcelFileIndex:
     """Class to manage indexed Excel files"""
     
-    def __init__(self, directory: str = XLSX_FILES_DIR, index_path: str = INDEX_FILE_PATH):
+    def __init__(self, directory: str = XLSX_FILES_DIR, index_path: str = INDEX_FILE_PATH,
+                 cache_dir: str = SHEET_CACHE_DIR, search_dir: str = SEARCH_INDEX_DIR,
+                 legacy_index_path: str = LEGACY_INDEX_FILE_PATH, load_existing: bool = True):
         self.directory = directory
         self.index_path = index_path
+        self.legacy_index_path = legacy_index_path
         self.files: Dict[str, ExcelFileInfo] = {}
+        # One row per file and per sheet; changed files are upserted individually
+        self.catalog = ExcelCatalog(index_path)
+        # Parsed sheets are cached column-wise on disk, keyed by file fingerprint
+        self.sheet_cache = SheetCache(cache_dir)
+        # Full-content inverted index over every cell, maintained per file
+        self.search_index = SearchIndex(search_dir)
+        # Trigram index over sheet and column names for fuzzy lookups
+        self.name_index = NameIndex()
         self.last_refresh_time = 0
+        # Serialises index updates between request threads and the directory watcher
+        self._lock = threading.RLock()
+        # Makes one process at a time the writer when several API workers share the catalog
+        self._writer_lock = FileLock(f"{index_path}.lock")
+        # Catalog version this process's in-memory view corresponds to
+        self._catalog_version: Optional[int] = None
+        # Virtual tables, recomputed whenever self.files is replaced
+        self._virtual_tables: Optional[Tuple[Dict[str, ExcelFileInfo], Dict[str, VirtualTable]]] = None
+        self.watcher: Optional[DirectoryWatcher] = None
+        # Changes applied by the watcher since they were last reported
+        self._recent_changes: Dict[str, List[str]] = {"added": [], "updated": [], "removed": []}
         # Load existing index if available, otherwise create a new one
-        self._load_index()
+        if load_existing:
+            self._load_index()
         
     def _load_index(self) -> None:
-        """Load index from JSON file if it exists"""
+        """Load index from the SQLite catalog, migrating the legacy JSON index if present"""
         try:
-            if os.path.exists(self.index_path):
-                with open(self.index_path, 'r') as f:
-                    try:
-                        index_data = json.load(f)
-                        
-                        self.last_refresh_time = index_data.get("last_refresh_time", 0)
-                        for filename, file_data in index_data.get("files", {}).items():
-                            self.files[filename] = ExcelFileInfo.from_dict(file_data)
-                        
-                        print(f"Loaded index with {len(self.files)} Excel files")
-                    except json.JSONDecodeError as e:
-                        print(f"Error parsing index file: {str(e)}. Creating new index.")
-                        # Backup corrupt file before overwriting
-                        backup_path = f"{self.index_path}.bak.{int(time.time())}"
-                        try:
-                            os.rename(self.index_path, backup_path)
-                            print(f"Backed up corrupt index to {backup_path}")
-                        except Exception as backup_err:
-                            print(f"Failed to back up corrupt index: {str(backup_err)}")
-                        self.refresh_index()
-            else:
+            is_new = not self.catalog.exists()
+            with self._writer():
+                if self.catalog.is_empty() and self.catalog.migrate_json(self.legacy_index_path):
+                    is_new = False
+            
+            self.last_refresh_time = float(self.catalog.get_meta("last_refresh_time", 0))
+            # Previews are the bulk of the catalog; they are loaded per file when needed
+            self._catalog_version, entries = self.catalog.load_snapshot(include_preview=False)
+            for filename, file_data in entries.items():
+                self.files[filename] = ExcelFileInfo.from_dict(file_data)
+                self.name_index.update_file(filename, self.files[filename].column_names)
+            
+            if is_new and not self.files:
                 print("No existing index found, creating new index")
                 self.refresh_index()
+            else:
+                print(f"Loaded index with {len(self.files)} Excel files")
+        except sqlite3.DatabaseError as e:
+            print(f"Error reading index catalog: {str(e)}. Creating new index.")
+            # Backup corrupt catalog before overwriting
+            backup_path = f"{self.index_path}.bak.{int(time.time())}"
+            try:
+                os.rename(self.index_path, backup_path)
+                print(f"Backed up corrupt index to {backup_path}")
+            except Exception as backup_err:
+                print(f"Failed to back up corrupt index: {str(backup_err)}")
+            self.files = {}
+            self.refresh_index()
         except Exception as e:
             print(f"Error loading index: {str(e)}")
             traceback.print_exc()
             self.refresh_index()
     
+    @contextmanager
+    def _writer(self):
+        """
+        Hold the index for writing: serialises threads of this process and, through
+        the lock file, other worker processes sharing the catalog. Whatever another
+        process published while we waited is picked up first, so it is not parsed again.
+        """
+        with self._lock:
+            with self._writer_lock:
+                self.sync_from_catalog()
+                yield
+                # Nobody else wrote while we held the lock, so memory matches the catalog
+                self._catalog_version = self.catalog.get_version()
+    
+    @property
+    def version(self) -> Optional[int]:
+        """Catalog version of the in-memory index; changes whenever a file is added, updated or removed"""
+        return self._catalog_version
+    
+    def sync_from_catalog(self) -> bool:
+        """
+        Pick up entries another process has published to the catalog
+        
+        Unchanged files keep their in-memory state; changed ones are taken from the
+        catalog as they are, and their term indexes and cached sheets are read from
+        the shared caches on demand, without parsing anything.
+        
+        Returns:
+            True if the in-memory index changed
+        """
+        try:
+            if self.catalog.get_version() == self._catalog_version:
+                return False
+            with self._lock:
+                version, entries = self.catalog.load_snapshot(include_preview=False)
+                files = {}
+                for filename, file_data in entries.items():
+                    current = self.files.get(filename)
+                    if current is not None and current.file_hash == file_data["file_hash"]:
+                        files[filename] = current
+                    else:
+                        files[filename] = ExcelFileInfo.from_dict(file_data)
+                        # Drop the stale terms; the new ones are loaded from disk when searched
+                        self.search_index.remove(filename, delete_file=False)
+                        self.name_index.update_file(filename, files[filename].column_names)
+                for filename in set(self.files) - set(entries):
+                    self.search_index.remove(filename, delete_file=False)
+                    self.name_index.remove_file(filename)
+                
+                self.files = files
+                self._catalog_version = version
+                self.last_refresh_time = float(self.catalog.get_meta("last_refresh_time", 0))
+            return True
+        except Exception as e:
+            print(f"Error syncing index from catalog: {str(e)}")
+            traceback.print_exc()
+            return False
+    
     def _save_index(self) -> None:
-        """Save index to JSON file"""
+        """Record the refresh time in the catalog; file entries are upserted as they change"""
         try:
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-            
-            # Prepare index data
-            index_data = {
-                "last_refresh_time": self.last_refresh_time,
-                "files": {filename: file_info.to_dict() for filename, file_info in self.files.items()}
-            }
-            
-            # Write to JSON file using custom encoder to handle non-serializable types
-            with open(self.index_path, 'w') as f:
-                json.dump(index_data, f, indent=2, cls=CustomJSONEncoder)
-            
+            self.catalog.set_meta("last_refresh_time", self.last_refresh_time)
             print(f"Saved index with {len(self.files)} Excel files")
         except Exception as e:
             print(f"Error saving index: {str(e)}")
@@ -139,7 +276,7 @@ class ExcelFileIndex:
                 return {k: self._clean_data_for_json(v) for k, v in data.items()}
             elif isinstance(data, list):
                 return [self._clean_data_for_json(item) for item in data]
-            elif isinstance(data, pd.Timestamp):
+            elif isinstance(data, (pd.Timestamp, datetime)):
                 return data.isoformat()
             elif isinstance(data, np.ndarray):
                 # Handle numpy arrays
@@ -157,11 +294,32 @@ class ExcelFileIndex:
             return str(data)
     
     def _calculate_file_hash(self, file_path: str) -> str:
-        """Calculate a hash of the file to detect content changes"""
+        """
+        Calculate a fingerprint of the file to detect content changes
+        
+        An .xlsx file is a zip archive whose central directory, at the end of the
+        file, lists every member with its size and CRC32. Hashing those entries
+        covers the whole content while only reading the directory. Files that
+        are not valid zip archives fall back to hashing the full file.
+        """
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                digest = hashlib.md5()
+                for member in sorted(archive.infolist(), key=lambda m: m.filename):
+                    digest.update(f"{member.filename}\0{member.file_size}\0{member.CRC:08x}\n".encode("utf-8"))
+                return f"zip-{digest.hexdigest()}"
+        except zipfile.BadZipFile:
+            pass
+        except Exception as e:
+            print(f"Error calculating hash for {file_path}: {str(e)}")
+            return ""
+        
         try:
+            digest = hashlib.md5()
             with open(file_path, 'rb') as f:
-                # Read first 8KB of file for quick hash
-                return hashlib.md5(f.read(8192)).hexdigest()
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            return f"md5-{digest.hexdigest()}"
         except Exception as e:
             print(f"Error calculating hash for {file_path}: {str(e)}")
             return ""
@@ -175,66 +333,196 @@ class ExcelFileIndex:
         if file_info is None:
             return True
         
-        # Check modified time
+        # Unchanged modified time is trusted only for fingerprints of the current
+        # format; entries from older indexes are re-fingerprinted once
         mtime = os.path.getmtime(file_path)
-        if mtime > file_info.modified_time:
-            # Also check hash to confirm real content changes (not just metadata)
-            current_hash = self._calculate_file_hash(file_path)
-            return current_hash != file_info.file_hash
+        if mtime == file_info.modified_time and file_info.file_hash.startswith(FINGERPRINT_PREFIXES):
+            return False
         
-        return False
+        # Also check the fingerprint to confirm real content changes (not just metadata)
+        current_hash = self._calculate_file_hash(file_path)
+        return current_hash != file_info.file_hash
     
-    def refresh_index(self) -> Dict[str, List[str]]:
-        """Read all Excel files in the directory and refresh the index"""
-        # Ensure directory exists
-        os.makedirs(self.directory, exist_ok=True)
+    def refresh_index(self, workers: Optional[int] = None) -> Dict[str, List[str]]:
+        """
+        Read all Excel files in the directory and refresh the index
         
-        # Find all Excel files
-        excel_files = glob.glob(os.path.join(self.directory, "*.xlsx"))
+        Changed workbooks are parsed in parallel worker processes when more than
+        one needs indexing; results are merged into the index under a single save.
         
-        # Track changes for reporting
+        Args:
+            workers: Number of worker processes (defaults to EXCEL_INDEX_WORKERS)
+        """
+        with self._writer():
+            # Ensure directory exists
+            os.makedirs(self.directory, exist_ok=True)
+            
+            # Find all Excel files
+            excel_files = [path for path in glob.glob(os.path.join(self.directory, "*.xlsx")) if is_excel_path(path)]
+            
+            removed_files = list(self.files.keys())  # Start with all files as potentially removed
+            changed_paths = []
+            
+            # Find the files that need (re)indexing
+            for file_path in excel_files:
+                filename = os.path.basename(file_path)
+                
+                # Check if file exists in index and needs updating
+                current_file_info = self.files.get(filename)
+                if filename in removed_files:
+                    removed_files.remove(filename)  # File still exists, not removed
+                
+                if self.has_file_changed(file_path, current_file_info):
+                    changed_paths.append(file_path)
+            
+            changes = self._apply_changes(changed_paths, removed_files, workers)
+            
+            # Update refresh time
+            self.last_refresh_time = time.time()
+            
+            # Save the updated index
+            self._save_index()
+            
+            # Return summary of changes
+            return changes
+    
+    def update_files(self, file_paths: List[str]) -> Dict[str, List[str]]:
+        """
+        Re-index only the given paths: new or changed workbooks are parsed and
+        deleted ones are dropped, without scanning the rest of the directory
+        """
+        with self._writer():
+            changed_paths = []
+            removed_files = []
+            for file_path in file_paths:
+                filename = os.path.basename(file_path)
+                if os.path.exists(file_path):
+                    if self.has_file_changed(file_path, self.files.get(filename)):
+                        changed_paths.append(file_path)
+                elif filename in self.files:
+                    removed_files.append(filename)
+            
+            changes = self._apply_changes(changed_paths, removed_files)
+            if any(changes.values()):
+                self._save_index()
+            return changes
+    
+    def _apply_changes(self, changed_paths: List[str], removed_files: List[str],
+                       workers: Optional[int] = None) -> Dict[str, List[str]]:
+        """Parse changed files and drop removed ones, returning a summary of changes"""
         added_files = []
         updated_files = []
-        removed_files = list(self.files.keys())  # Start with all files as potentially removed
         
-        # Process each file
-        for file_path in excel_files:
+        # Parse changed files, possibly in parallel, and merge them as they complete
+        for file_path, parsed in self._parse_files(changed_paths, workers):
+            if parsed is None:
+                continue
             filename = os.path.basename(file_path)
-            
-            # Check if file exists in index and needs updating
-            current_file_info = self.files.get(filename)
-            if filename in removed_files:
-                removed_files.remove(filename)  # File still exists, not removed
-            
-            if self.has_file_changed(file_path, current_file_info):
-                try:
-                    self._index_file(file_path)
-                    if current_file_info:
-                        updated_files.append(filename)
-                    else:
-                        added_files.append(filename)
-                except Exception as e:
-                    print(f"Error indexing {file_path}: {str(e)}")
-                    traceback.print_exc()
+            is_update = filename in self.files
+            self._register_file(*parsed)
+            if is_update:
+                # Cached sheets belong to the old version of the file
+                self.sheet_cache.invalidate(filename, keep_fingerprint=self.files[filename].file_hash)
+                updated_files.append(filename)
+            else:
+                added_files.append(filename)
         
         # Remove files that no longer exist
         for filename in removed_files:
             if filename in self.files:
-                del self.files[filename]
-        
-        # Update refresh time
-        self.last_refresh_time = time.time()
-        
-        # Save the updated index
-        self._save_index()
+                # Copy on write so readers iterating the old mapping are unaffected
+                self.files = {name: info for name, info in self.files.items() if name != filename}
+            self.catalog.delete_file(filename)
+            self.sheet_cache.invalidate(filename)
+            self.search_index.remove(filename)
+            self.name_index.remove_file(filename)
         
-        # Return summary of changes
         return {
             "added": added_files,
             "updated": updated_files,
             "removed": removed_files
         }
     
+    def start_watcher(self) -> bool:
+        """
+        Start watching the Excel directory so changed files are re-indexed in the
+        background. Returns True if the watcher is running.
+        """
+        with self._lock:
+            if self.watcher is not None:
+                return self.watcher.running
+            self.watcher = DirectoryWatcher(self.directory, self._on_files_changed)
+            if not self.watcher.start():
+                return False
+        # Pick up anything that changed while no watcher was running
+        self._record_changes(self.refresh_index())
+        return True
+    
+    def stop_watcher(self) -> None:
+        """Stop the directory watcher if it is running"""
+        with self._lock:
+            watcher, self.watcher = self.watcher, None
+        if watcher is not None:
+            watcher.stop()
+    
+    @property
+    def is_watching(self) -> bool:
+        return self.watcher is not None and self.watcher.running
+    
+    def _on_files_changed(self, file_paths: List[str]) -> None:
+        """Watcher callback: re-index the changed paths"""
+        self._record_changes(self.update_files(file_paths))
+    
+    def _record_changes(self, changes: Dict[str, List[str]]) -> None:
+        with self._lock:
+            for kind, filenames in changes.items():
+                recent = self._recent_changes.setdefault(kind, [])
+                recent.extend(name for name in filenames if name not in recent)
+    
+    def pop_recent_changes(self) -> Dict[str, List[str]]:
+        """Return the changes applied in the background since the last call"""
+        with self._lock:
+            changes = self._recent_changes
+            self._recent_changes = {"added": [], "updated": [], "removed": []}
+            return changes
+    
+    def _parse_files(self, file_paths: List[str], workers: Optional[int] = None):
+        """
+        Parse workbooks, yielding (file_path, parsed result or None) as each one completes
+        
+        With more than one worker the files are parsed in a process pool. A failure
+        only affects the workbook that raised it; that file stays out of the index
+        and is retried on the next refresh.
+        """
+        if workers is None:
+            workers = INDEX_WORKERS
+        workers = min(workers, len(file_paths))
+        
+        # Pool workers never start pools of their own
+        if workers <= 1 or _in_index_worker:
+            for file_path in file_paths:
+                yield file_path, self._parse_file(file_path)
+            return
+        
+        print(f"Indexing {len(file_paths)} Excel files with {workers} worker processes")
+        # Spawned rather than forked: the pool may be started by the watcher or
+        # warm-up thread while other threads hold locks
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_index_worker,
+            initargs=(self.directory, self.sheet_cache.cache_dir, self.search_index.index_dir)
+        ) as pool:
+            futures = {pool.submit(_parse_file_in_worker, file_path): file_path for file_path in file_paths}
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    yield file_path, future.result()
+                except Exception as e:
+                    print(f"Error indexing {file_path}: {str(e)}")
+                    traceback.print_exc()
+                    yield file_path, None
+    
     def _safe_read_excel(self, file_path, sheet_name=None, **kwargs):
         """Safely read an Excel file, handling various errors"""
         try:
@@ -249,6 +537,30 @@ class ExcelFileIndex:
     
     def _index_file(self, file_path: str) -> None:
         """Index a single Excel file"""
+        with self._writer():
+            parsed = self._parse_file(file_path)
+            if parsed is not None:
+                self._register_file(*parsed)
+    
+    def _register_file(self, file_info: ExcelFileInfo, term_index: FileTermIndex) -> None:
+        """Merge a parsed workbook into the index"""
+        # Copy on write so readers iterating the old mapping are unaffected
+        self.files = {**self.files, file_info.filename: file_info}
+        self.search_index.update(file_info.filename, term_index)
+        self.name_index.update_file(file_info.filename, file_info.column_names)
+        try:
+            self.catalog.upsert_file(file_info.to_dict())
+        except Exception as e:
+            print(f"Error saving {file_info.filename} to the index catalog: {str(e)}")
+            traceback.print_exc()
+    
+    def _parse_file(self, file_path: str) -> Optional[Tuple[ExcelFileInfo, FileTermIndex]]:
+        """
+        Parse a single Excel file into its index entry and term index
+        
+        This only writes to the on-disk caches, never to self.files, so it can run
+        in a worker process. Returns None if the workbook could not be read.
+        """
         filename = os.path.basename(file_path)
         print(f"Indexing {filename}...")
         
@@ -256,46 +568,47 @@ class ExcelFileIndex:
         modified_time = os.path.getmtime(file_path)
         file_hash = self._calculate_file_hash(file_path)
         
-        # Read Excel file with pandas
+        # Stream the workbook in read-only mode; sheets are never materialised
         try:
-            # Use ExcelFile for better performance when reading multiple sheets
-            excel_file = pd.ExcelFile(file_path)
-            sheets = excel_file.sheet_names
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
             
+            sheets = []
             row_count = {}
             column_names = {}
             preview = {}
+            profile = {}
+            # Every cell goes into the file's term index for full-content search
+            term_builder = TermIndexBuilder(file_hash)
             
-            # Process each sheet
-            for sheet in sheets:
-                try:
-                    # Read with a maximum of 1000 rows for efficiency
-                    df = self._safe_read_excel(excel_file, sheet_name=sheet, nrows=1000)
-                    
-                    if df.empty:
+            try:
+                # Process each sheet
+                for worksheet in workbook.worksheets:
+                    sheet = worksheet.title
+                    sheets.append(sheet)
+                    sheet_idx = term_builder.add_sheet(sheet)
+                    try:
+                        profiler = SheetProfiler()
+                        rows, columns, preview_rows = self._scan_sheet(worksheet, sheet_idx, term_builder, profiler)
+                        term_builder.set_columns(sheet_idx, columns)
+                        row_count[sheet] = rows
+                        column_names[sheet] = columns
+                        profile[sheet] = profiler.build(columns, rows)
+                        # Clean preview data to ensure it's JSON serializable
+                        preview[sheet] = self._clean_data_for_json(preview_rows)
+                    except Exception as sheet_err:
+                        print(f"Error processing sheet '{sheet}' in {filename}: {str(sheet_err)}")
+                        # Add empty data for this sheet
                         row_count[sheet] = 0
                         column_names[sheet] = []
                         preview[sheet] = []
-                        continue
-                        
-                    row_count[sheet] = len(df)
-                    column_names[sheet] = [str(col) for col in df.columns.tolist()]
-                    
-                    # Generate a preview with a few rows
-                    preview_rows = min(5, len(df))
-                    preview_data = df.head(preview_rows).to_dict(orient='records')
-                    
-                    # Clean preview data to ensure it's JSON serializable
-                    preview[sheet] = self._clean_data_for_json(preview_data)
-                except Exception as sheet_err:
-                    print(f"Error processing sheet '{sheet}' in {filename}: {str(sheet_err)}")
-                    # Add empty data for this sheet
-                    row_count[sheet] = 0
-                    column_names[sheet] = []
-                    preview[sheet] = []
+                        # An empty profile, so describe reports it unavailable
+                        # instead of trying to profile the sheet again
+                        profile[sheet] = []
+            finally:
+                workbook.close()
             
-            # Store the file info
-            self.files[filename] = ExcelFileInfo(
+            # Build the file info
+            file_info = ExcelFileInfo(
                 filename=filename,
                 filepath=file_path,
                 sheets=sheets,
@@ -303,12 +616,64 @@ class ExcelFileIndex:
                 column_names=column_names,
                 preview=preview,
                 modified_time=modified_time,
-                file_hash=file_hash
+                file_hash=file_hash,
+                profile=profile
             )
+            return file_info, term_builder.build()
             
         except Exception as e:
             print(f"Error processing {filename}: {str(e)}")
             traceback.print_exc()
+            return None
+    
+    def _scan_sheet(self, worksheet, sheet_idx: int, term_builder: TermIndexBuilder,
+                    profiler: Optional[SheetProfiler] = None,
+                    preview_size: int = 5) -> Tuple[int, List[str], List[Dict[str, Any]]]:
+        """
+        Scan a read-only worksheet in a single pass with constant memory
+        
+        Every data cell is added to the term index and, if given, the column profiler.
+        
+        Rows, columns and headers follow pd.read_excel: the first row is the
+        header, trailing empty rows and columns are ignored, and blank or
+        duplicate headers get pandas' "Unnamed: i" / "name.1" labels.
+        
+        Returns:
+            A tuple of (exact data row count, column names, preview rows)
+        """
+        header: List[Any] = []
+        preview_cells: List[List[Any]] = []
+        width = 0
+        row_count = 0
+        
+        for row_idx, values in enumerate(worksheet.iter_rows(values_only=True)):
+            # Trim trailing empty cells the same way pandas does
+            last = len(values)
+            while last and (values[last - 1] is None or values[last - 1] == ""):
+                last -= 1
+            width = max(width, last)
+            
+            if row_idx == 0:
+                header = list(values[:last])
+                continue
+            
+            data_row = row_idx - 1
+            if last:
+                row_count = data_row + 1
+            if data_row < preview_size:
+                preview_cells.append(list(values[:last]))
+            for col_idx in range(last):
+                if values[col_idx] is not None:
+                    term_builder.add_cell(sheet_idx, data_row, col_idx, values[col_idx])
+                    if profiler is not None:
+                        profiler.add(col_idx, values[col_idx])
+        
+        columns = _header_names(header, width)
+        preview_rows = [
+            {col: (cells[i] if i < len(cells) else None) for i, col in enumerate(columns)}
+            for cells in preview_cells[:row_count]
+        ]
+        return row_count, columns, preview_rows
     
     def get_file_list(self) -> List[str]:
         """Get list of all indexed Excel files"""
@@ -316,103 +681,800 @@ class ExcelFileIndex:
     
     def get_file_info(self, filename: str) -> Optional[Dict[str, Any]]:
         """Get information about a specific file"""
-        if filename in self.files:
-            return self.files[filename].to_dict()
-        return None
+        file_info = self.files.get(filename)
+        if file_info is None:
+            return None
+        if file_info.preview is None:
+            file_info.preview = self.catalog.load_preview(filename)
+        return file_info.to_dict()
+    
+    def describe_sheet(self, filename: str, sheet_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored column profile of a sheet
+        
+        Profiles are computed when a file version is indexed. Entries indexed before
+        profiles existed are profiled once from the sheet cache and stored.
+        
+        Returns:
+            {"filename", "sheet", "row_count", "columns"} with one profile per column,
+            plus a "note" when no column could be profiled (e.g. the sheet failed
+            to parse), or None if the file or sheet is unknown
+        """
+        if not self._ensure_file_indexed(filename):
+            return None
+        file_info = self.files[filename]
+        if sheet_name not in file_info.sheets:
+            return None
+        
+        if file_info.profile is None:
+            file_info.profile = self.catalog.load_profile(filename)
+        columns = file_info.profile.get(sheet_name)
+        if columns is None:
+            df = self._load_sheet_frame(filename, sheet_name)
+            if df is None:
+                return None
+            columns = profile_frame(df)
+            file_info.profile = {**file_info.profile, sheet_name: columns}
+            try:
+                self.catalog.set_profile(filename, sheet_name, columns)
+            except Exception as e:
+                print(f"Error saving profile of {sheet_name} in {filename}: {str(e)}")
+        
+        description = {
+            "filename": filename,
+            "sheet": sheet_name,
+            "row_count": file_info.row_count.get(sheet_name, 0),
+            "columns": columns
+        }
+        if not columns:
+            description["note"] = "Profile unavailable: the sheet is empty or could not be read"
+        return description
+    
+    def find_names(self, query: str, max_results: int = 10,
+                   kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Fuzzy-match a column or sheet name across every indexed file
+        
+        Args:
+            query: The name to look for; case, spacing and punctuation are ignored
+            max_results: Maximum number of names to return
+            kind: Only match "column" or "sheet" names
+        
+        Returns:
+            Ranked matches with name, kind, score and the files and sheets containing them
+        """
+        return self.name_index.search(query, max_results=max_results, kind=kind)
+    
+    def _suggest_columns(self, column: str, available: List[str]) -> str:
+        """Suffix for unknown-column errors naming the closest columns of the sheet"""
+        candidates = set(available)
+        names = [match["name"] for match in self.name_index.search(column, max_results=50, kind="column")
+                 if match["name"] in candidates][:3]
+        if not names:
+            return ""
+        return ". Did you mean: " + ", ".join(f"'{name}'" for name in names) + "?"
+    
+    def _ensure_search_index(self) -> None:
+        """Load or build the term index of any file that does not have an up-to-date one"""
+        def find_missing():
+            missing_paths = []
+            for filename, file_info in self.files.items():
+                if self.search_index.load(filename, file_info.file_hash):
+                    continue
+                file_path = os.path.join(self.directory, filename)
+                if os.path.exists(file_path):
+                    missing_paths.append(file_path)
+            return missing_paths
+        
+        if not find_missing():
+            return
+        with self._writer():
+            # Another worker process may have built them while we waited
+            rebuilt = False
+            for file_path, parsed in self._parse_files(find_missing()):
+                if parsed is not None:
+                    self._register_file(*parsed)
+                    rebuilt = True
+            if rebuilt:
+                self._save_index()
     
-    def search_in_files(self, query: str) -> Dict[str, List[Dict[str, Any]]]:
+    def search_in_files(self, query: str, max_results: int = 100) -> Dict[str, List[Dict[str, Any]]]:
         """
         Search for query in Excel files and return matching information
-        This is a simple search that looks for the query in column names and preview data
+        Column names are matched by substring; cell contents are looked up in the
+        full-content inverted index, so every row of every sheet is searchable.
+        Data matches are ordered by relevance, and files by their best match.
+        
+        At most max_results data matches are returned, shared between the files;
+        "_match_counts" holds every file's total number of matching cells, so
+        callers can tell when a file's matches were cut.
         """
-        # First ensure any new files are indexed
-        if time.time() - self.last_refresh_time > 300:  # Auto-refresh if over 5 minutes
+        # First ensure any new files are indexed; the watcher keeps the index current
+        if not self.is_watching and time.time() - self.last_refresh_time > 300:  # Auto-refresh if over 5 minutes
             self.refresh_index()
+        
+        with self._lock:
+            self._ensure_search_index()
+            hits, match_counts = self.search_index.search(query, max_results=max_results)
             
         results = {}
         
         # Convert query to lowercase for case-insensitive search
-        query = query.lower()
+        lowered_query = query.lower()
         
+        # Search in column names
         for filename, file_info in self.files.items():
-            file_matches = []
-            
-            # Search in column names
             for sheet, columns in file_info.column_names.items():
-                matching_columns = [col for col in columns if query in str(col).lower()]
+                matching_columns = [col for col in columns if lowered_query in str(col).lower()]
                 if matching_columns:
-                    file_matches.append({
+                    results.setdefault(filename, []).append({
                         "sheet": sheet,
                         "matching_columns": matching_columns,
                         "type": "column_match"
                     })
-            
-            # Search in preview data
-            for sheet, preview_data in file_info.preview.items():
-                for row_idx, row in enumerate(preview_data):
-                    for col, value in row.items():
-                        # Convert value to string for searching
-                        str_value = str(value).lower()
-                        if query in str_value:
-                            file_matches.append({
-                                "sheet": sheet,
-                                "row": row_idx,
-                                "column": col,
-                                "value": value,
-                                "type": "data_match"
-                            })
-            
-            if file_matches:
-                results[filename] = file_matches
         
+        # Search in cell data through the inverted index
+        for hit in hits:
+            if hit["filename"] not in self.files:
+                continue
+            results.setdefault(hit["filename"], []).append({
+                "sheet": hit["sheet"],
+                "row": hit["row"],
+                "column": hit["column"],
+                "value": hit["value"],
+                "score": hit["score"],
+                "type": "data_match"
+            })
+        
+        # Files with the strongest data matches come first
+        def best_score(item):
+            return max((match.get("score", 0) for match in item[1]), default=0)
+        results = dict(sorted(results.items(), key=best_score, reverse=True))
+        results["_match_counts"] = {
+            filename: count for filename, count in match_counts.items() if filename in self.files
+        }
         return results
     
-    def read_sheet_data(self, filename: str, sheet_name: str, max_rows: int = 1000) -> List[Dict[str, Any]]:
-        """Read data from a specific sheet in a file"""
-        # First check if file exists in the index
-        if filename not in self.files:
-            # If not in index, check if it's a new file that needs indexing
-            file_path = os.path.join(self.directory, filename)
-            if os.path.exists(file_path):
-                try:
-                    self._index_file(file_path)
-                    self._save_index()
-                except Exception as e:
-                    print(f"Error indexing new file {filename}: {str(e)}")
-                    traceback.print_exc()
-                    return []
+    def read_sheet_page(self, filename: str, sheet_name: str, max_rows: int = 100,
+                        columns: Optional[List[str]] = None,
+                        filters: Optional[List[Dict[str, Any]]] = None,
+                        offset: int = 0, cursor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Read one page of matching rows and a cursor for the next page
+        
+        Args:
+            max_rows: Page size
+            offset: Number of matching rows to skip (ignored when a cursor is given)
+            cursor: Opaque cursor returned with a previous page of the same query
+        
+        Returns:
+            {"frame", "offset", "total_rows", "next_cursor"} where frame holds the
+            page rows and next_cursor is None on the last page, or None if the
+            file or sheet is unknown
+        
+        Raises:
+            ValueError: If a column, filter or the cursor is invalid
+        """
+        selection = self._sheet_selection(filename, sheet_name, columns, filters)
+        if selection is None:
+            return None
+        df, positions = selection
+        table = self.get_virtual_table(filename)
+        fingerprint = table.fingerprint if table is not None else self.files[filename].file_hash
+        query_key = _query_key(sheet_name, columns, filters)
+        if cursor:
+            offset = decode_cursor(cursor, fingerprint, query_key)
+        
+        total_rows = len(positions) if positions is not None else len(df)
+        start = min(max(offset, 0), total_rows)
+        stop = min(start + max(max_rows, 0), total_rows)
+        return {
+            "frame": self._take_rows(df, positions, start, stop),
+            "offset": start,
+            "total_rows": total_rows,
+            "next_cursor": encode_cursor(stop, fingerprint, query_key) if stop < total_rows else None
+        }
+    
+    def iter_sheet_rows(self, filename: str, sheet_name: str,
+                        columns: Optional[List[str]] = None,
+                        filters: Optional[List[Dict[str, Any]]] = None,
+                        offset: int = 0, max_rows: Optional[int] = None,
+                        chunk_size: int = STREAM_CHUNK_ROWS):
+        """
+        Prepare a chunked row iterator over a sheet
+        
+        The sheet is selected (and the query validated) immediately; rows are only
+        materialised chunk by chunk as the iterator is consumed.
+        
+        Returns:
+            (total matching rows, iterator of DataFrame chunks), or None if the
+            file or sheet is unknown
+        
+        Raises:
+            ValueError: If a requested column or filter is invalid
+        """
+        selection = self._sheet_selection(filename, sheet_name, columns, filters)
+        if selection is None:
+            return None
+        df, positions = selection
+        total_rows = len(positions) if positions is not None else len(df)
+        start = min(max(offset, 0), total_rows)
+        stop = total_rows if max_rows is None else min(start + max(max_rows, 0), total_rows)
+        
+        def chunks():
+            for chunk_start in range(start, stop, max(chunk_size, 1)):
+                yield self._take_rows(df, positions, chunk_start, min(chunk_start + chunk_size, stop))
+        
+        return total_rows, chunks()
+    
+    def query_sheet(self, filename: str, sheet_name: str, columns: Optional[List[str]] = None,
+                    filters: Optional[List[Dict[str, Any]]] = None) -> Optional[pd.DataFrame]:
+        """
+        Load a sheet with column projection and filter predicates applied
+        
+        Only the projected and filtered columns are loaded from the sheet cache,
+        and filters run vectorised over the frame before anything is serialised.
+        
+        Returns:
+            The matching rows as a DataFrame, or None if the file or sheet is unknown
+        
+        Raises:
+            ValueError: If a requested column or filter is invalid
+        """
+        selection = self._sheet_selection(filename, sheet_name, columns, filters)
+        if selection is None:
+            return None
+        df, positions = selection
+        return df.take(positions) if positions is not None else df
+    
+    def _sheet_selection(self, filename: str, sheet_name: str, columns: Optional[List[str]],
+                         filters: Optional[List[Dict[str, Any]]]) -> Optional[Tuple[pd.DataFrame, Optional[np.ndarray]]]:
+        """
+        Validate a query and resolve it to the projected frame plus the positions
+        of matching rows (None when unfiltered), without copying the matching rows
+        """
+        table = self.get_virtual_table(filename)
+        if table is not None:
+            if sheet_name != table.sheet:
+                return None
+            available = [SOURCE_FILE_COLUMN] + table.columns
+        else:
+            if not self._ensure_file_indexed(filename):
+                return None
+            file_info = self.files[filename]
+            if sheet_name not in file_info.sheets:
+                return None
+            available = file_info.column_names.get(sheet_name, [])
+        filters = filters or []
+        for column in list(columns or []) + [f.get("column") for f in filters]:
+            if column not in available:
+                raise ValueError(f"Unknown column '{column}' in sheet '{sheet_name}' of {filename}"
+                                 + self._suggest_columns(column, available))
+        
+        wanted = None
+        if columns:
+            wanted = list(dict.fromkeys(list(columns) + [f["column"] for f in filters]))
+        keep = None
+        if table is not None:
+            df, keep = self._load_virtual_frame(table, wanted)
+        else:
+            df = self._load_sheet_frame(filename, sheet_name, wanted)
+        if df is None:
+            return None
+        
+        mask = filter_mask(df, filters) if filters else None
+        if keep is not None:
+            mask = keep if mask is None else mask & keep
+        positions = np.flatnonzero(mask) if mask is not None else None
+        if columns:
+            df = df[list(dict.fromkeys(columns))]
+        return df, positions
+    
+    @staticmethod
+    def _take_rows(df: pd.DataFrame, positions: Optional[np.ndarray], start: int, stop: int) -> pd.DataFrame:
+        """Slice matching rows [start, stop) out of a selection"""
+        if positions is None:
+            return df.iloc[start:stop]
+        return df.take(positions[start:stop])
+    
+    def aggregate_sheet(self, filename: str, sheet_name: str, metrics: List[Dict[str, Any]],
+                        group_by: Optional[List[str]] = None,
+                        filters: Optional[List[Dict[str, Any]]] = None,
+                        limit: int = 50) -> Optional[Dict[str, Any]]:
+        """
+        Aggregate a whole sheet server-side, optionally grouped and filtered
+        
+        Returns:
+            {"frame", "matched_rows", "total_groups"} where frame is the result
+            table, or None if the file or sheet is unknown
+        
+        Raises:
+            ValueError: If a column, metric or filter is invalid
+        """
+        group_by = list(group_by or [])
+        metrics = [m.model_dump() if isinstance(m, BaseModel) else m for m in metrics]
+        if not metrics:
+            raise ValueError("At least one metric is required")
+        needed = group_by + [m["column"] for m in metrics if m.get("column") != "*"]
+        if not needed:
+            # Only row counts were requested; any single column will do
+            table = self.get_virtual_table(filename)
+            info = self.files.get(filename)
+            if table is not None:
+                needed = table.columns[:1]
             else:
-                return []
+                needed = (info.column_names.get(sheet_name) or [])[:1] if info else []
+        
+        df = self.query_sheet(filename, sheet_name, columns=needed or None, filters=filters)
+        if df is None:
+            return None
+        
+        table = aggregate_frame(df, metrics, group_by)
+        total_groups = len(table)
+        return {
+            "frame": table.head(max(limit, 1)),
+            "matched_rows": len(df),
+            "total_groups": total_groups
+        }
+    
+    def virtual_tables(self) -> Dict[str, VirtualTable]:
+        """
+        Group sheets with identical column lists in two or more files into virtual tables
+        
+        Tables are named after the files' common stem ("CostarExport (5).xlsx" and
+        "CostarExport (6).xlsx" -> "CostarExport") and addressed with the
+        filename "virtual:<name>" and the shared sheet name.
+        """
+        files = self.files
+        cached = self._virtual_tables
+        if cached is not None and cached[0] is files:
+            return cached[1]
+        
+        groups: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+        for filename, info in files.items():
+            for sheet in info.sheets:
+                columns = info.column_names.get(sheet) or []
+                if columns and info.row_count.get(sheet):
+                    groups.setdefault(tuple(columns), []).append((filename, sheet))
+        
+        tables: Dict[str, VirtualTable] = {}
+        for columns, members in groups.items():
+            if len({filename for filename, _ in members}) < 2:
+                continue
+            members.sort(key=lambda member: (-files[member[0]].modified_time, member[0], member[1]))
+            sheets = {sheet for _, sheet in members}
+            sheet = sheets.pop() if len(sheets) == 1 else "combined"
+            stems = {re.sub(r"\s*\(\d+\)$", "", os.path.splitext(filename)[0]) for filename, _ in members}
+            name = stems.pop() if len(stems) == 1 else sheet
+            while name in tables:
+                name += "+"
+            digest = hashlib.md5(json.dumps(
+                [[filename, member_sheet, files[filename].file_hash] for filename, member_sheet in members]
+            ).encode("utf-8")).hexdigest()
+            tables[name] = VirtualTable(
+                name=name,
+                sheet=sheet,
+                columns=list(columns),
+                members=members,
+                key=_detect_record_key(list(columns)),
+                fingerprint=f"virtual-{digest}",
+                row_count=sum(files[filename].row_count.get(member_sheet, 0) for filename, member_sheet in members)
+            )
+        
+        self._virtual_tables = (files, tables)
+        return tables
+    
+    def get_virtual_table(self, filename: str) -> Optional[VirtualTable]:
+        """Resolve a "virtual:<name>" filename to its virtual table"""
+        if not filename.startswith(VIRTUAL_TABLE_PREFIX):
+            return None
+        return self.virtual_tables().get(filename[len(VIRTUAL_TABLE_PREFIX):])
+    
+    def _load_virtual_frame(self, table: VirtualTable,
+                            columns: Optional[List[str]] = None) -> Tuple[Optional[pd.DataFrame], Optional[np.ndarray]]:
+        """
+        Concatenate the member sheets of a virtual table into one frame
         
+        Returns:
+            (frame with a source-file column, mask of rows to keep after dropping
+            records that also appear in a newer file), or (None, None) if no member
+            could be loaded
+        """
+        load_columns = None
+        if columns is not None:
+            load_columns = [col for col in dict.fromkeys(list(columns) + table.key) if col != SOURCE_FILE_COLUMN]
+        
+        frames = []
+        sources = []
+        for filename, sheet in table.members:
+            if filename not in self.files:
+                continue
+            df = self._load_sheet_frame(filename, sheet, load_columns)
+            if df is not None:
+                frames.append(df)
+                sources.append(filename)
+        if not frames:
+            return None, None
+        
+        df = pd.concat(frames, ignore_index=True)
+        # Source index per row; 0 is the newest file
+        source_codes = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+        source = pd.DataFrame({SOURCE_FILE_COLUMN: pd.Categorical.from_codes(source_codes, categories=sources)})
+        df = pd.concat([source, df], axis=1)
+        
+        keep = None
+        if table.key and len(frames) > 1:
+            key_frame = df[table.key]
+            newest = (pd.Series(source_codes)
+                      .groupby([key_frame[col] for col in table.key], dropna=False, sort=False)
+                      .transform("min").to_numpy())
+            # Rows whose key is (partly) missing cannot be matched and are always kept
+            keep = (source_codes == newest) | key_frame.isna().any(axis=1).to_numpy()
+        return df, keep
+    
+    def _ensure_file_indexed(self, filename: str) -> bool:
+        """Check the file is in the index, indexing it first if it is new on disk"""
+        if filename in self.files:
+            return True
+        # If not in index, check if it's a new file that needs indexing
+        file_path = os.path.join(self.directory, filename)
+        if not os.path.exists(file_path):
+            return False
         try:
-            # Read directly from file
-            file_path = os.path.join(self.directory, filename)
-            df = self._safe_read_excel(file_path, sheet_name=sheet_name, nrows=max_rows)
-            
-            if df.empty:
-                return []
-                
-            # Convert to dict and ensure it's JSON serializable
-            data = df.to_dict(orient='records')
-            return self._clean_data_for_json(data)
+            # Goes through the writer lock, so a file another worker already indexed is not parsed again
+            self.update_files([file_path])
         except Exception as e:
-            print(f"Error reading sheet {sheet_name} from {filename}: {str(e)}")
+            print(f"Error indexing new file {filename}: {str(e)}")
             traceback.print_exc()
-            return []
+        return filename in self.files
+    
+    def _load_sheet_frame(self, filename: str, sheet_name: str,
+                          columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """Load a sheet (optionally only some columns), parsing the workbook only if the sheet is not cached yet"""
+        file_info = self.files[filename]
+        fingerprint = file_info.file_hash
+        
+        df = self.sheet_cache.load(filename, fingerprint, sheet_name, columns)
+        if df is not None:
+            return df
+        
+        file_path = os.path.join(self.directory, filename)
+        if sheet_name not in file_info.sheets:
+            return None
+        try:
+            df = pd.read_excel(file_path, sheet_name=sheet_name)
+        except Exception as e:
+            # Nothing is cached, so the next read tries the workbook again
+            print(f"Error reading sheet {sheet_name} from {filename}: {str(e)}")
+            raise
+        # Use string column names so cached and freshly parsed frames look the same
+        df.columns = [str(col) for col in df.columns]
+        self.sheet_cache.store(filename, fingerprint, sheet_name, df)
+        return df[columns] if columns is not None else df
+
+def _detect_record_key(columns: List[str]) -> List[str]:
+    """
+    Pick the columns identifying a record (a property) in a virtual table:
+    an ID column if there is one, otherwise the property address with its city
+    and zip code. Returns an empty list when nothing suitable exists.
+    """
+    normalized = {normalize_name(col): col for col in reversed(columns)}
+    for name in ("propertyid", "costarpropertyid", "costarid", "id"):
+        if name in normalized:
+            return [normalized[name]]
+    for name in ("propertyaddress", "address"):
+        if name in normalized:
+            return [normalized[name]] + [normalized[part] for part in ("city", "zip") if part in normalized]
+    return []
+
+def _query_key(sheet_name: str, columns: Optional[List[str]],
+               filters: Optional[List[Dict[str, Any]]]) -> str:
+    """Short digest identifying a read query, so a cursor cannot be replayed against another"""
+    payload = json.dumps([sheet_name, columns or [], filters or []], sort_keys=True, default=str)
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()[:12]
+
+def encode_cursor(offset: int, fingerprint: str, query_key: str) -> str:
+    """Build an opaque pagination cursor"""
+    payload = json.dumps({"o": offset, "f": fingerprint, "q": query_key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, fingerprint: str, query_key: str) -> int:
+    """
+    Resolve a pagination cursor to a row offset
+    
+    Raises:
+        ValueError: If the cursor is malformed, belongs to another query, or the
+            file has changed since it was issued
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset = int(payload["o"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if payload.get("q") != query_key:
+        raise ValueError("Cursor does not belong to this query")
+    if payload.get("f") != fingerprint:
+        raise ValueError("The file has changed since this cursor was issued; restart from the first page")
+    return offset
+
+# Operators accepted in sheet filters
+FILTER_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "contains", "in")
+
+class SheetFilter(BaseModel):
+    """A predicate on one column, e.g. {"column": "RBA", "op": ">", "value": 100000}"""
+    column: str
+    op: Literal["=", "!=", "<", "<=", ">", ">=", "contains", "in"]
+    value: Union[str, float, bool, List[Union[str, float]]]
+
+def _coerce_filter_value(series: pd.Series, value: Any) -> Any:
+    """Convert a filter value to the type of the column it is compared with"""
+    if pd.api.types.is_bool_dtype(series):
+        return str(value).strip().lower() in ("true", "1", "yes") if isinstance(value, str) else bool(value)
+    if pd.api.types.is_numeric_dtype(series):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Filter value {value!r} for numeric column '{series.name}' is not a number")
+    if pd.api.types.is_datetime64_any_dtype(series):
+        try:
+            return pd.Timestamp(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Filter value {value!r} for date column '{series.name}' is not a date")
+    return value
+
+def _column_mask(series: pd.Series, op: str, value: Any) -> pd.Series:
+    """Evaluate one predicate over a column; missing values never match"""
+    if op == "contains":
+        return series.astype("string").str.contains(str(value), case=False, regex=False).fillna(False).astype(bool)
+    
+    if op == "in":
+        values = value if isinstance(value, list) else [value]
+        coerced = [_coerce_filter_value(series, v) for v in values]
+        if series.dtype == object:
+            # Text columns match case-insensitively
+            lowered = {str(v).casefold() for v in coerced}
+            return series.astype("string").str.casefold().isin(lowered).fillna(False).astype(bool)
+        return series.isin(coerced)
+    
+    target = _coerce_filter_value(series, value)
+    if series.dtype == object:
+        if isinstance(target, (int, float)) and not isinstance(target, bool):
+            # Numbers stored in a mixed/text column: compare numerically where possible
+            series = pd.to_numeric(series, errors="coerce")
+        elif op in ("=", "!="):
+            equal = series.astype("string").str.casefold() == str(target).casefold()
+            equal = equal.fillna(False).astype(bool)
+            return equal if op == "=" else ~equal & series.notna()
+        else:
+            series = series.astype("string")
+            target = str(target)
+    
+    if op == "=":
+        mask = series == target
+    elif op == "!=":
+        mask = (series != target) & series.notna()
+    elif op == "<":
+        mask = series < target
+    elif op == "<=":
+        mask = series <= target
+    elif op == ">":
+        mask = series > target
+    else:
+        mask = series >= target
+    return mask.fillna(False).astype(bool)
+
+def filter_mask(df: pd.DataFrame, filters: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Combine filter predicates with AND into a boolean row mask
+    
+    Each filter is a dict (or SheetFilter) with "column", "op" and "value".
+    
+    Raises:
+        ValueError: If a filter references an unknown column or operator
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for spec in filters:
+        if isinstance(spec, BaseModel):
+            spec = spec.model_dump()
+        column, op, value = spec.get("column"), spec.get("op"), spec.get("value")
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator '{op}'; use one of {', '.join(FILTER_OPERATORS)}")
+        if column not in df.columns:
+            raise ValueError(f"Unknown filter column '{column}'")
+        mask &= _column_mask(df[column], op, value).to_numpy()
+    return mask
+
+# Aggregations accepted in sheet metrics, besides percentiles written as "p0".."p100"
+AGGREGATIONS = ("count", "sum", "mean", "median", "min", "max", "std", "nunique")
+
+class SheetMetric(BaseModel):
+    """An aggregation of one column, e.g. {"column": "RBA", "agg": "mean"}; use "*" with "count" for row counts"""
+    column: str
+    agg: str
+
+def _metric_label(metric: Dict[str, Any]) -> str:
+    return f"{metric['agg']}({metric['column']})"
+
+def aggregate_frame(df: pd.DataFrame, metrics: List[Dict[str, Any]],
+                    group_by: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Compute metrics over a frame, per group if group_by is given
+    
+    Every metric is a vectorised pandas reduction over the whole column (or
+    over all groups at once). Groups are ordered by the first metric, largest first.
+    
+    Raises:
+        ValueError: If a metric references an unknown column or aggregation
+    """
+    group_by = list(group_by or [])
+    for column in group_by:
+        if column not in df.columns:
+            raise ValueError(f"Unknown group_by column '{column}'")
+    
+    grouped = df.groupby(group_by, dropna=False, sort=False, observed=True) if group_by else None
+    results = {}
+    for metric in metrics:
+        column, agg = metric.get("column"), str(metric.get("agg", "")).lower()
+        label = _metric_label({"column": column, "agg": agg})
+        if agg == "count" and column == "*":
+            results[label] = grouped.size() if grouped is not None else len(df)
+            continue
+        if column not in df.columns:
+            raise ValueError(f"Unknown metric column '{column}'")
+        
+        quantile = None
+        if agg.startswith("p") and agg[1:].replace(".", "", 1).isdigit():
+            quantile = float(agg[1:]) / 100
+            if not 0 <= quantile <= 1:
+                raise ValueError(f"Percentile '{agg}' must be between p0 and p100")
+        elif agg not in AGGREGATIONS:
+            raise ValueError(f"Unsupported aggregation '{agg}'; use one of {', '.join(AGGREGATIONS)} or a percentile such as p90")
+        
+        values = df[column]
+        if agg not in ("count", "nunique") and not pd.api.types.is_numeric_dtype(values) \
+                and not (agg in ("min", "max") and pd.api.types.is_datetime64_any_dtype(values)):
+            # Numbers stored as text are converted; anything else is ignored as missing
+            values = pd.to_numeric(values, errors="coerce")
+        
+        target = values.groupby([df[col] for col in group_by], dropna=False, sort=False, observed=True) if grouped is not None else values
+        results[label] = target.quantile(quantile) if quantile is not None else target.agg(agg)
+    
+    if grouped is None:
+        return pd.DataFrame([results])
+    
+    table = pd.DataFrame(results)
+    first = table.columns[0]
+    table = table.sort_values(first, ascending=False, na_position="last")
+    return table.reset_index()
+
+def _header_names(header: List[Any], width: int) -> List[str]:
+    """Build column names from a header row the way pd.read_excel labels them"""
+    names = []
+    seen: Dict[str, int] = {}
+    for i in range(width):
+        value = header[i] if i < len(header) else None
+        if value is None or value == "":
+            name = f"Unnamed: {i}"
+        elif isinstance(value, float) and value.is_integer():
+            name = str(int(value))
+        else:
+            name = str(value)
+        # Mangle duplicates as pandas does: "Name", "Name.1", "Name.2", ...
+        base = name
+        while name in seen:
+            seen[base] += 1
+            name = f"{base}.{seen[base]}"
+        seen[name] = 0
+        names.append(name)
+    return names
+
+# Index used by the current process when it is an indexing pool worker
+_worker_index: Optional[ExcelFileIndex] = None
+# Set in indexing pool workers, which never start pools of their own. Server
+# workers are child processes too, so parent_process() cannot tell them apart
+_in_index_worker = False
+
+def _init_index_worker(directory: str, cache_dir: str, search_dir: str) -> None:
+    """Set up a parser in a pool worker without loading the index itself"""
+    global _worker_index, _in_index_worker
+    _in_index_worker = True
+    _worker_index = ExcelFileIndex(directory, cache_dir=cache_dir, search_dir=search_dir, load_existing=False)
+
+def _parse_file_in_worker(file_path: str) -> Optional[Tuple[ExcelFileInfo, FileTermIndex]]:
+    """Parse one workbook in a pool worker"""
+    return _worker_index._parse_file(file_path)
+
+# The global index is created on first use (or by the startup warm-up) rather
+# than at import time, so importing this module never parses workbooks
+_excel_index: Optional[ExcelFileIndex] = None
+_excel_index_lock = threading.Lock()
+_warmup_status: Dict[str, Any] = {"state": "cold", "started_at": None, "ready_at": None, "error": None}
+
+def get_excel_index() -> ExcelFileIndex:
+    """Get the global Excel index, creating it on first use"""
+    global _excel_index
+    if _excel_index is None:
+        with _excel_index_lock:
+            if _excel_index is None:
+                _excel_index = ExcelFileIndex()
+                return _excel_index
+    # Other worker processes may have published changes to the shared catalog
+    _excel_index.sync_from_catalog()
+    return _excel_index
+
+def get_excel_index_version() -> Optional[int]:
+    """
+    Get the current version of the Excel index, for caching results derived from it
+    
+    Without the directory watcher, the directory is checked for changed files first
+    so the version reflects what is on disk. The changes found are kept for
+    get_excel_files_info to report.
+    """
+    excel_index = get_excel_index()
+    if not excel_index.start_watcher():
+        excel_index._record_changes(excel_index.refresh_index())
+    return excel_index.version
+
+def pop_excel_index_changes() -> Dict[str, List[str]]:
+    """Return and forget the files added, updated or removed since the last call"""
+    return get_excel_index().pop_recent_changes()
+
+def __getattr__(name: str):
+    # Keep `from tools.read_xlsx_files import excel_index` working, lazily
+    if name == "excel_index":
+        return get_excel_index()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _warm_excel_index() -> None:
+    """Load the index, start the directory watcher and load the search index"""
+    try:
+        index = get_excel_index()
+        index.start_watcher()
+        with index._lock:
+            index._ensure_search_index()
+        _warmup_status.update(state="ready", ready_at=time.time())
+        print(f"Excel index warm with {len(index.files)} files")
+    except Exception as e:
+        _warmup_status.update(state="failed", error=str(e))
+        print(f"Error warming Excel index: {str(e)}")
+        traceback.print_exc()
+
+def start_excel_index_warmup() -> None:
+    """Warm the global Excel index in a background thread (idempotent)"""
+    with _excel_index_lock:
+        if _warmup_status["state"] in ("warming", "ready"):
+            return
+        _warmup_status.update(state="warming", started_at=time.time(), error=None)
+    threading.Thread(target=_warm_excel_index, name="excel-index-warmup", daemon=True).start()
 
-# Create a global index instance
-excel_index = ExcelFileIndex()
+def get_excel_index_status() -> Dict[str, Any]:
+    """Report whether the Excel index is warm"""
+    status = dict(_warmup_status)
+    status["ready"] = status["state"] == "ready"
+    if _excel_index is not None:
+        status["files"] = len(_excel_index.files)
+        status["watching"] = _excel_index.is_watching
+    return status
 
-def get_excel_files_info() -> str:
+def get_excel_files_info(include_changes: bool = True) -> Dict[str, Any]:
     """
     Get information about all indexed Excel files in the system.
     
+    Args:
+        include_changes: Report (under "_changes") and forget the files added,
+            updated or removed since the last call; otherwise they are kept
+            for the next caller that asks
+    
     Returns:
-        A JSON string with information about all Excel files, including filename, 
+        A dictionary with information about all Excel files, including filename, 
         sheet names, row counts, and column names.
     """
-    # Check for new files before returning info
-    changes = excel_index.refresh_index()
+    excel_index = get_excel_index()
+    # With the directory watcher running this is a pure in-memory lookup;
+    # otherwise check for new files before returning info
+    if not excel_index.start_watcher():
+        excel_index._record_changes(excel_index.refresh_index())
     
     # Create a simplified view of the files
     files_info = {}
@@ -424,11 +1486,12 @@ def get_excel_files_info() -> str:
         }
     
     # Add changes information
-    files_info["_changes"] = changes
+    if include_changes:
+        files_info["_changes"] = excel_index.pop_recent_changes()
     
-    return json.dumps(files_info, indent=2, cls=CustomJSONEncoder)
+    return files_info
 
-def search_excel_files(query: str) -> str:
+def search_excel_files(query: str) -> Dict[str, Any]:
     """
     Search for a term across all Excel files.
     
@@ -436,13 +1499,33 @@ def search_excel_files(query: str) -> str:
         query: The search term to look for in Excel files
         
     Returns:
-        A JSON string with search results matching the query
+        A dictionary with the search results matching the query, by file
     """
+    excel_index = get_excel_index()
     # Use the indexed data for searching
-    results = excel_index.search_in_files(query)
-    return json.dumps(results, indent=2, cls=CustomJSONEncoder)
+    return excel_index.search_in_files(query)
 
-def read_excel_sheet(filename: str, sheet_name: str, max_rows: int = 100) -> str:
+def read_excel_sheet_frame(filename: str, sheet_name: str, max_rows: int = 100,
+                           columns: Optional[List[str]] = None, offset: int = 0,
+                           filters: Optional[List[Dict[str, Any]]] = None,
+                           cursor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Read one page of a sheet as a DataFrame, for callers that render it themselves.
+    
+    Returns:
+        {"frame", "offset", "total_rows", "next_cursor"}, or None if the file or
+        sheet is not found
+    
+    Raises:
+        ValueError: If a column, filter or the cursor is invalid
+    """
+    excel_index = get_excel_index()
+    return excel_index.read_sheet_page(filename, sheet_name, max_rows, columns=columns,
+                                       filters=filters, offset=offset, cursor=cursor)
+
+def read_excel_sheet(filename: str, sheet_name: str, max_rows: int = 100,
+                     columns: Optional[List[str]] = None, offset: int = 0,
+                     filters: Optional[List[Dict[str, Any]]] = None) -> str:
     """
     Read data from a specific sheet in an Excel file.
     
@@ -450,12 +1533,79 @@ def read_excel_sheet(filename: str, sheet_name: str, max_rows: int = 100) -> str
         filename: The name of the Excel file
         sheet_name: The name of the sheet to read
         max_rows: Maximum number of rows to read (default 100)
+        columns: Optional list of columns to return
+        offset: Number of matching rows to skip
+        filters: Optional predicates ({"column", "op", "value"}) that rows must all match
         
     Returns:
         A JSON string with the data from the specified sheet
+    
+    Raises:
+        ValueError: If a requested column or filter is invalid
+    """
+    page = read_excel_sheet_frame(filename, sheet_name, max_rows, columns=columns,
+                                  offset=offset, filters=filters)
+    if page is None:
+        return "[]"
+    return records_json(page["frame"]).decode("utf-8")
+
+def read_excel_sheet_page(filename: str, sheet_name: str, max_rows: int = 100,
+                          columns: Optional[List[str]] = None, offset: int = 0,
+                          filters: Optional[List[Dict[str, Any]]] = None,
+                          cursor: Optional[str] = None) -> Optional[bytes]:
     """
-    data = excel_index.read_sheet_data(filename, sheet_name, max_rows)
-    return json.dumps(data, indent=2, cls=CustomJSONEncoder)
+    Read one page of a sheet along with a cursor for the next page.
+    
+    Args:
+        filename: The name of the Excel file
+        sheet_name: The name of the sheet to read
+        max_rows: Page size
+        columns: Optional list of columns to return
+        offset: Number of matching rows to skip on the first page
+        filters: Optional predicates ({"column", "op", "value"}) that rows must all match
+        cursor: Cursor returned by the previous page
+        
+    Returns:
+        JSON bytes {"data", "offset", "total_rows", "next_cursor"}, encoded
+        directly from the sheet columns, or None if the file or sheet is not found
+    
+    Raises:
+        ValueError: If a column, filter or the cursor is invalid
+    """
+    page = read_excel_sheet_frame(filename, sheet_name, max_rows, columns=columns,
+                                  offset=offset, filters=filters, cursor=cursor)
+    if page is None:
+        return None
+    return json_object({
+        "data": records_json(page["frame"]),
+        "offset": page["offset"],
+        "total_rows": page["total_rows"],
+        "next_cursor": page["next_cursor"]
+    })
+
+def stream_excel_sheet(filename: str, sheet_name: str, columns: Optional[List[str]] = None,
+                       offset: int = 0, max_rows: Optional[int] = None,
+                       filters: Optional[List[Dict[str, Any]]] = None):
+    """
+    Stream the rows of a sheet as newline-delimited JSON.
+    
+    The query is validated before this returns, so errors surface before the
+    first byte is sent; rows are then encoded chunk by chunk.
+    
+    Returns:
+        (total matching rows, iterator of NDJSON byte chunks), or None if the
+        file or sheet is not found
+    
+    Raises:
+        ValueError: If a requested column or filter is invalid
+    """
+    excel_index = get_excel_index()
+    selection = excel_index.iter_sheet_rows(filename, sheet_name, columns=columns, filters=filters,
+                                            offset=offset, max_rows=max_rows)
+    if selection is None:
+        return None
+    total_rows, chunks = selection
+    return total_rows, (ndjson(chunk) for chunk in chunks)
 
 def get_excel_file_preview(filename: str) -> str:
     """
@@ -467,6 +1617,7 @@ def get_excel_file_preview(filename: str) -> str:
     Returns:
         A JSON string with preview data for each sheet in the file
     """
+    excel_index = get_excel_index()
     # First check if new files need to be indexed
     if filename not in excel_index.files:
         changes = excel_index.refresh_index()
@@ -478,15 +1629,155 @@ def get_excel_file_preview(filename: str) -> str:
     
     return json.dumps({"error": f"File {filename} not found"}, cls=CustomJSONEncoder)
 
-def refresh_excel_index() -> str:
+def describe_excel_sheet(filename: str, sheet_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Get per-column statistics of a sheet without reading the workbook.
+    
+    Args:
+        filename: The name of the Excel file
+        sheet_name: The name of the sheet
+        
+    Returns:
+        A dictionary with the row count and, for each column, its inferred dtype,
+        null count, min/max, mean, distinct-count estimate and most frequent
+        values, or None if the file or sheet is not found
+    """
+    excel_index = get_excel_index()
+    return excel_index.describe_sheet(filename, sheet_name)
+
+def get_virtual_tables_info() -> List[Dict[str, Any]]:
+    """
+    List virtual tables: sheets with the same columns in several files (such as
+    repeated CoStar exports) that can be read, filtered and aggregated as one.
+    
+    Returns:
+        Per table, the filename to use ("virtual:<name>"), sheet name, member
+        files, dedup key, row count and column names.
+    """
+    excel_index = get_excel_index()
+    return [table.to_dict() for table in excel_index.virtual_tables().values()]
+
+def find_excel_columns(query: str, max_results: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Find column or sheet names similar to a query across all Excel files.
+    
+    Args:
+        query: The name to look for, e.g. "Cap Rate" also finds "Cap_Rate %"
+        max_results: Maximum number of names to return
+        kind: Optionally only "column" or "sheet" names
+        
+    Returns:
+        Ranked matches with the files and sheets containing them
+    """
+    excel_index = get_excel_index()
+    return excel_index.find_names(query, max_results=max_results, kind=kind)
+
+def get_excel_file_preview_json(filename: str) -> Optional[bytes]:
+    """
+    Get a preview of all sheets in an Excel file as JSON bytes.
+    
+    The preview rows are stored as JSON in the catalog and are passed through
+    without being decoded.
+    
+    Returns:
+        JSON bytes mapping each sheet to its preview rows, or None if the file is not found
+    """
+    excel_index = get_excel_index()
+    if filename not in excel_index.files:
+        excel_index.refresh_index()
+    if filename not in excel_index.files:
+        return None
+    previews = excel_index.catalog.load_preview_json(filename)
+    return json_object({sheet: RawJSON(preview.encode("utf-8")) for sheet, preview in previews.items()})
+
+def aggregate_excel_sheet_json(filename: str, sheet_name: str, metrics: List[Dict[str, Any]],
+                               group_by: Optional[List[str]] = None,
+                               filters: Optional[List[Dict[str, Any]]] = None,
+                               limit: int = 50) -> Optional[bytes]:
+    """
+    Aggregate a sheet server-side over all of its rows.
+    
+    Args:
+        filename: The name of the Excel file
+        sheet_name: The name of the sheet
+        metrics: Aggregations, each {"column", "agg"} (count, sum, mean, median,
+            min, max, std, nunique or a percentile such as p90)
+        group_by: Optional columns to group by
+        filters: Optional predicates ({"column", "op", "value"}) applied first
+        limit: Maximum number of groups to return
+        
+    Returns:
+        JSON bytes {"columns", "rows", "matched_rows", "total_groups"}, or None if
+        the file or sheet is not found
+    
+    Raises:
+        ValueError: If a column, metric or filter is invalid
+    """
+    excel_index = get_excel_index()
+    result = excel_index.aggregate_sheet(filename, sheet_name, metrics, group_by=group_by,
+                                         filters=filters, limit=limit)
+    if result is None:
+        return None
+    table = result["frame"]
+    return json_object({
+        "columns": [str(col) for col in table.columns],
+        "rows": values_json(table),
+        "matched_rows": result["matched_rows"],
+        "total_groups": result["total_groups"]
+    })
+
+def aggregate_excel_sheet(filename: str, sheet_name: str, metrics: List[Dict[str, Any]],
+                          group_by: Optional[List[str]] = None,
+                          filters: Optional[List[Dict[str, Any]]] = None,
+                          limit: int = 50) -> str:
+    """
+    Aggregate a sheet server-side over all of its rows.
+    
+    Returns:
+        A JSON string with the result table (see aggregate_excel_sheet_json)
+    
+    Raises:
+        ValueError: If a column, metric or filter is invalid
+    """
+    result = aggregate_excel_sheet_json(filename, sheet_name, metrics, group_by=group_by,
+                                        filters=filters, limit=limit)
+    if result is None:
+        return json.dumps({"error": f"Sheet {sheet_name} not found in {filename}"}, cls=CustomJSONEncoder)
+    return result.decode("utf-8")
+
+def index_excel_file(filename: str) -> Dict[str, Any]:
+    """
+    Index a single workbook in the Excel directory, e.g. right after it was uploaded,
+    without scanning the rest of the directory.
+    
+    Args:
+        filename: The name of the Excel file
+        
+    Returns:
+        The changes made and the file's sheets, row counts and column names
+        (None if the file could not be indexed)
+    """
+    excel_index = get_excel_index()
+    changes = excel_index.update_files([os.path.join(excel_index.directory, filename)])
+    # Kept for list_excel_files too: the watcher will find the file already indexed
+    excel_index._record_changes(changes)
+    file_info = excel_index.files.get(filename)
+    info = None
+    if file_info is not None:
+        info = {
+            "sheets": file_info.sheets,
+            "row_count": file_info.row_count,
+            "column_names": file_info.column_names
+        }
+    return {"changes": changes, "file": info}
+
+def refresh_excel_index() -> Dict[str, List[str]]:
     """
     Manually refresh the Excel index.
     
     Returns:
-        A JSON string with information about the changes made during refresh.
+        The files added, updated and removed by the refresh
     """
-    changes = excel_index.refresh_index()
-    return json.dumps(changes, indent=2, cls=CustomJSONEncoder)
+    excel_index = get_excel_index()
+    return excel_index.refresh_index()
 
-# Call refresh_index when the module is imported to initialize the index
-# excel_index.refresh_index()
@@ -0,0 +1,212 @@
+"""
+Bounded LRU cache for tool results.
+
+Agent tools are called with the same arguments several times within one
+conversation. Their formatted results are kept here, keyed by tool name and
+arguments, and bounded both by entry count and by total size. Each cache
+follows a version (such as the Excel index version): when the version changes,
+every entry is dropped, so a result is never served for data that has since
+changed. Caches of remote results can instead give entries a time to live and
+drop selected entries when the data behind them changes.
+"""
+
+import os
+import json
+import time
+import threading
+import functools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+# Default bounds, overridable per cache
+CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", 256))
+CACHE_MAX_BYTES = int(float(os.getenv("TOOL_CACHE_MAX_MB", 16)) * 1024 * 1024)
+
+_caches: Dict[str, "ResultCache"] = {}
+
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    # Seconds it took to compute the value, saved by every hit
+    cost: float
+    expires_at: Optional[float]
+
+
+def _result_size(value: Any) -> int:
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return len(repr(value))
+
+
+def _key_default(obj: Any) -> Any:
+    # Pydantic models (tool arguments such as filters) are keyed by their fields
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return str(obj)
+
+
+def make_key(name: str, args: Tuple, kwargs: Dict[str, Any]) -> str:
+    """Build a cache key from a tool name and its call arguments"""
+    return name + ":" + json.dumps([args, kwargs], sort_keys=True, default=_key_default)
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded by entry count and total result size"""
+
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES,
+                 ttl: Optional[float] = None, size_of: Callable[[Any], int] = _result_size):
+        """
+        Args:
+            name: Name the cache is reported under
+            max_entries: Maximum number of entries
+            max_bytes: Maximum total size of the entries, as measured by size_of
+            ttl: Seconds an entry stays valid, or None for no expiry
+            size_of: Size of a cached value in bytes
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size_of = size_of
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._version: Any = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+        _caches[name] = self
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a result
+
+        Returns:
+            (True, value) on a hit, (False, None) on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= entry.size
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry.cost
+            return True, entry.value
+
+    def put(self, key: Hashable, value: Any, cost: float = 0.0) -> None:
+        """
+        Store a result, evicting the least recently used ones to stay within bounds
+
+        Args:
+            cost: Seconds it took to compute the value, counted as saved on every hit
+        """
+        size = self.size_of(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = _Entry(value, size, cost, expires_at)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def invalidate(self, match: Callable[[Hashable], bool]) -> int:
+        """
+        Drop the entries whose key matches
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            keys = [key for key in self._entries if match(key)]
+            for key in keys:
+                self._bytes -= self._entries.pop(key).size
+            if keys:
+                self.invalidations += 1
+            return len(keys)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def set_version(self, version: Any) -> None:
+        """Drop every entry if the data version has changed since the last call"""
+        with self._lock:
+            if version == self._version:
+                return
+            self._version = version
+        self.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "ttl": self.ttl,
+                "version": self._version,
+            }
+
+    def cached(self, version: Optional[Callable[[], Any]] = None):
+        """
+        Decorator caching a function's results by its name and arguments
+
+        Args:
+            version: Called before every lookup; when its value changes the cache is cleared
+
+        Exceptions are not cached.
+        """
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                current = None
+                if version is not None:
+                    current = version()
+                    self.set_version(current)
+                # The version is part of the key too, so a result computed while the
+                # version changed can never be served under the new one
+                key = (current, make_key(func.__name__, args, kwargs))
+                hit, value = self.get(key)
+                if hit:
+                    return value
+                start = time.perf_counter()
+                value = func(*args, **kwargs)
+                self.put(key, value, cost=time.perf_counter() - start)
+                return value
+            wrapper.cache = self
+            return wrapper
+        return decorator
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistics of every result cache, by name"""
+    return {name: cache.stats() for name, cache in _caches.items()}
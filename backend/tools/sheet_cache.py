@@ -0,0 +1,139 @@
+"""
+On-disk columnar cache for parsed Excel sheets.
+
+Each sheet is parsed once with pandas and stored as one .npy file per column,
+keyed by the workbook's filename and fingerprint. Numeric and datetime columns
+are memory-mapped on load, so repeat reads only touch the pages they need.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import traceback
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Base directory where cached sheet columns are stored
+SHEET_CACHE_DIR = os.path.join(os.getcwd(), "uploads", "sheet_cache")
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _safe_name(name: str) -> str:
+    """Turn a filename or sheet name into a stable, filesystem-safe directory name"""
+    digest = hashlib.md5(name.encode("utf-8")).hexdigest()[:12]
+    readable = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)[:48]
+    return f"{readable}-{digest}"
+
+
+class SheetCache:
+    """Columnar cache of parsed sheets, one directory per file version"""
+
+    def __init__(self, cache_dir: str = SHEET_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _file_dir(self, filename: str) -> str:
+        return os.path.join(self.cache_dir, _safe_name(filename))
+
+    def _sheet_dir(self, filename: str, fingerprint: str, sheet_name: str) -> str:
+        return os.path.join(self._file_dir(filename), fingerprint or "unknown", _safe_name(sheet_name))
+
+    def has(self, filename: str, fingerprint: str, sheet_name: str) -> bool:
+        """Check whether a sheet is cached for this file version"""
+        sheet_dir = self._sheet_dir(filename, fingerprint, sheet_name)
+        return os.path.exists(os.path.join(sheet_dir, MANIFEST_NAME))
+
+    def load(self, filename: str, fingerprint: str, sheet_name: str,
+             columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Load a cached sheet as a DataFrame.
+
+        Args:
+            filename: The name of the Excel file
+            fingerprint: The file fingerprint the cache entry was stored under
+            sheet_name: The name of the sheet
+            columns: Optional subset of columns to load; only those files are opened
+
+        Returns:
+            The cached DataFrame, or None if the sheet is not cached
+        """
+        sheet_dir = self._sheet_dir(filename, fingerprint, sheet_name)
+        manifest_path = os.path.join(sheet_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+
+            wanted = manifest["columns"]
+            if columns is not None:
+                requested = set(columns)
+                wanted = [col for col in wanted if col["name"] in requested]
+
+            data = {}
+            for col in wanted:
+                path = os.path.join(sheet_dir, col["file"])
+                if col["pickled"]:
+                    data[col["name"]] = np.load(path, allow_pickle=True)
+                else:
+                    data[col["name"]] = np.load(path, mmap_mode="r")
+
+            return pd.DataFrame(data, index=pd.RangeIndex(manifest["row_count"]), copy=False)
+        except Exception as e:
+            print(f"Error loading cached sheet '{sheet_name}' of {filename}: {str(e)}")
+            traceback.print_exc()
+            return None
+
+    def store(self, filename: str, fingerprint: str, sheet_name: str, df: pd.DataFrame) -> None:
+        """Write a parsed sheet to the cache, one .npy file per column"""
+        sheet_dir = self._sheet_dir(filename, fingerprint, sheet_name)
+        parent_dir = os.path.dirname(sheet_dir)
+        os.makedirs(parent_dir, exist_ok=True)
+
+        # Write into a temporary directory first so readers never see a partial entry
+        tmp_dir = tempfile.mkdtemp(dir=parent_dir, prefix=".tmp-")
+        try:
+            columns = []
+            for i, name in enumerate(df.columns):
+                values = df[name].to_numpy()
+                pickled = values.dtype.kind == "O"
+                file_name = f"c{i:04d}.npy"
+                np.save(os.path.join(tmp_dir, file_name), values, allow_pickle=pickled)
+                columns.append({"name": str(name), "file": file_name, "pickled": pickled})
+
+            manifest = {"sheet": sheet_name, "row_count": len(df), "columns": columns}
+            with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as f:
+                json.dump(manifest, f)
+
+            if os.path.exists(sheet_dir):
+                shutil.rmtree(sheet_dir, ignore_errors=True)
+            os.replace(tmp_dir, sheet_dir)
+        except Exception as e:
+            print(f"Error caching sheet '{sheet_name}' of {filename}: {str(e)}")
+            traceback.print_exc()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def invalidate(self, filename: str, keep_fingerprint: Optional[str] = None) -> None:
+        """
+        Drop cached sheets for a file.
+
+        Args:
+            filename: The name of the Excel file
+            keep_fingerprint: If given, the cache entry for this version is kept
+        """
+        file_dir = self._file_dir(filename)
+        if not os.path.isdir(file_dir):
+            return
+
+        if keep_fingerprint is None:
+            shutil.rmtree(file_dir, ignore_errors=True)
+            return
+
+        for entry in os.listdir(file_dir):
+            if entry != keep_fingerprint:
+                shutil.rmtree(os.path.join(file_dir, entry), ignore_errors=True)
@@ -0,0 +1,155 @@
+"""
+Token-budgeted text rendering of sheet data.
+
+Wide exports (hundreds of columns) rendered in full fill an LLM's context with
+empty and repeated cells. The renderer converts each column to display strings
+once, drops columns that are empty in the rows shown, folds columns holding a
+single value into one summary line, and keeps the most informative remaining
+columns and as many rows as fit the token budget. Output is a markdown table or
+compact CSV/TSV, assembled column by column.
+"""
+
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from tools.excel_json import format_column
+
+# Token budget for one rendered table
+DEFAULT_TOKEN_BUDGET = int(os.getenv("EXCEL_TABLE_TOKEN_BUDGET", 4000))
+# Rough characters per token for tabular text
+CHARS_PER_TOKEN = 4
+# Most columns shown when they are picked by informativeness
+MAX_COLUMNS = int(os.getenv("EXCEL_TABLE_MAX_COLUMNS", 20))
+# Fewer columns are shown rather than fewer than this many rows
+MIN_ROWS = 5
+# Share of the budget the single-value summary line may use
+CONSTANT_SHARE = 0.2
+TABLE_FORMATS = ("markdown", "csv", "tsv")
+
+
+@dataclass
+class RenderedTable:
+    """A rendered table and what was left out to fit the budget"""
+    text: str
+    rows: int
+    columns: List[str]
+    # Columns with the same value in every row shown, with that value
+    constant_columns: Dict[str, str] = field(default_factory=dict)
+    # Columns that are empty in every row shown
+    empty_columns: List[str] = field(default_factory=list)
+    # Columns left out because they did not fit the budget
+    omitted_columns: List[str] = field(default_factory=list)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of rendered text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def render_table(df: pd.DataFrame, token_budget: int = DEFAULT_TOKEN_BUDGET, fmt: str = "markdown",
+                 max_width: int = 50, prioritize: bool = True) -> RenderedTable:
+    """
+    Render a frame as text that fits a token budget
+
+    Args:
+        df: The rows to render
+        token_budget: Approximate number of tokens the output may use
+        fmt: "markdown", "csv" or "tsv"
+        max_width: Cell text longer than this is truncated
+        prioritize: Show at most MAX_COLUMNS columns, ranked by how much of them
+            is filled, instead of every column that fits in its original order.
+            Ties keep sheet order (exports put key fields first), and the first
+            column, usually the record's name or address, is always kept
+
+    Returns:
+        The rendered table; rows shown is a prefix of df. When every column is
+        empty or single-valued, text is empty and all rows count as shown, since
+        constant_columns and empty_columns describe them completely
+
+    Raises:
+        ValueError: If fmt is not a supported format
+    """
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format '{fmt}'. Use one of: {', '.join(TABLE_FORMATS)}")
+
+    n_rows = len(df)
+    names = [str(col) for col in df.columns]
+    budget = max(token_budget, 1) * CHARS_PER_TOKEN
+    markdown = fmt == "markdown"
+    separator = 3 if markdown else 1
+
+    rendered = RenderedTable(text="", rows=0, columns=[])
+    candidates = []
+    for position, name in enumerate(names):
+        cells = format_column(df.iloc[:, position], max_width, escape_pipes=markdown)
+        lengths = pd.Series(cells, dtype=object).str.len().to_numpy()
+        filled = int(np.count_nonzero(lengths))
+        if filled == 0:
+            rendered.empty_columns.append(name)
+            continue
+        if n_rows > 1 and filled == n_rows and pd.unique(cells).size == 1:
+            rendered.constant_columns[name] = cells[0]
+            continue
+        # Fill rate in quarters, so columns of similar fill keep their sheet order
+        score = round(4 * filled / n_rows) / 4
+        # A markdown header also costs its "---" separator cell
+        header_cost = len(name) + separator + (6 if markdown else 0)
+        candidates.append((position, name, cells, score, header_cost, lengths.mean() + separator))
+
+    # Single-valued columns are summarised on one line, within their share of the budget
+    constant_budget = budget * CONSTANT_SHARE
+    for name, value in list(rendered.constant_columns.items()):
+        cost = len(name) + len(value) + 5
+        if cost > constant_budget:
+            del rendered.constant_columns[name]
+            rendered.omitted_columns.append(name)
+        else:
+            constant_budget -= cost
+            budget -= cost
+
+    if prioritize and candidates:
+        order = [candidates[0]] + sorted(candidates[1:], key=lambda c: (-c[3], c[0]))
+        order, skipped = order[:MAX_COLUMNS], order[MAX_COLUMNS:]
+    else:
+        order, skipped = candidates, []
+    if not order:
+        rendered.rows = n_rows
+        return rendered
+
+    # Drop the least informative columns until at least MIN_ROWS rows fit
+    target_rows = min(n_rows, MIN_ROWS)
+    row_base = 4.0 if markdown else 0.0
+    header_costs = np.cumsum([c[4] for c in order])
+    row_costs = row_base + np.cumsum([c[5] for c in order])
+    fits = np.flatnonzero(header_costs + row_costs * target_rows <= budget)
+    count = int(fits[-1]) + 1 if fits.size else 1
+    chosen, skipped = order[:count], order[count:] + skipped
+    rendered.omitted_columns.extend(c[1] for c in sorted(skipped, key=lambda c: c[0]))
+    header_chars = header_costs[count - 1]
+    row_chars = row_costs[count - 1]
+
+    rows = int((budget - header_chars) // row_chars)
+    rows = min(n_rows, max(rows, 1))
+    chosen.sort(key=lambda c: c[0])
+    rendered.columns = [c[1] for c in chosen]
+    rendered.rows = rows
+
+    if markdown:
+        columns = [pd.Series(c[2][:rows], dtype=object) for c in chosen]
+        body = columns[0].str.cat(columns[1:], sep=" | ") if len(columns) > 1 else columns[0]
+        lines = [
+            "| " + " | ".join(rendered.columns) + " |",
+            "| " + " | ".join("---" for _ in rendered.columns) + " |",
+        ]
+        lines.extend(("| " + body + " |").tolist())
+        rendered.text = "\n".join(lines)
+    else:
+        table = pd.DataFrame({i: c[2][:rows] for i, c in enumerate(chosen)})
+        table.columns = rendered.columns
+        rendered.text = table.to_csv(sep="," if fmt == "csv" else "\t", index=False, lineterminator="\n").rstrip("\n")
+    return rendered
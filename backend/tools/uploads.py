@@ -0,0 +1,104 @@
+"""
+Streaming, atomic file uploads.
+
+An upload is written to a hidden temporary file next to its destination in
+fixed-size chunks, so memory use does not depend on the file size, and is
+renamed into place only once it is complete and valid. Readers (and the
+directory watcher, which ignores hidden files) never see a partial file.
+"""
+
+import os
+import uuid
+from typing import AsyncIterator, Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+# Bytes written to disk at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Largest accepted Excel upload
+MAX_EXCEL_UPLOAD_BYTES = int(float(os.getenv("EXCEL_MAX_UPLOAD_MB", 100)) * 1024 * 1024)
+
+
+class UploadError(ValueError):
+    """The upload was rejected"""
+
+
+class UploadTooLarge(UploadError):
+    """The upload exceeded the size limit"""
+
+
+def safe_upload_name(filename: str, extensions=(".xlsx",)) -> str:
+    """
+    Reduce a client-supplied filename to a plain name inside the upload directory
+
+    Raises:
+        UploadError: If nothing usable is left, or the extension is not allowed
+    """
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    name = "".join(ch for ch in name if ch.isprintable())
+    if not name or name.startswith("."):
+        raise UploadError(f"Invalid filename '{filename}'")
+    if not name.lower().endswith(tuple(extensions)):
+        raise UploadError(f"Only {', '.join(extensions)} files can be uploaded")
+    return name
+
+
+async def save_stream_atomic(chunks: AsyncIterator[bytes], path: str,
+                             chunk_size: int = UPLOAD_CHUNK_SIZE,
+                             max_bytes: Optional[int] = None,
+                             validate: Optional[Callable[[str], bool]] = None) -> int:
+    """
+    Write an async byte stream to path atomically
+
+    Incoming data is buffered up to chunk_size and each full chunk is written in a
+    worker thread, so the event loop never blocks on disk I/O.
+
+    Args:
+        chunks: The byte stream, e.g. request.stream()
+        path: Final location of the file
+        chunk_size: Size of each disk write
+        max_bytes: Reject the upload once it grows past this many bytes
+        validate: Called with the complete temporary file; returning False rejects it
+
+    Returns:
+        Number of bytes written
+
+    Raises:
+        UploadTooLarge: If the stream exceeds max_bytes
+        UploadError: If validate rejects the file
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".upload-{uuid.uuid4().hex}.part")
+
+    size = 0
+    buffer = bytearray()
+    out = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        try:
+            async for data in chunks:
+                size += len(data)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds the limit of {max_bytes // (1024 * 1024)} MB")
+                buffer += data
+                while len(buffer) >= chunk_size:
+                    chunk = bytes(buffer[:chunk_size])
+                    del buffer[:chunk_size]
+                    await run_in_threadpool(out.write, chunk)
+            if buffer:
+                await run_in_threadpool(out.write, bytes(buffer))
+            await run_in_threadpool(out.flush)
+            await run_in_threadpool(os.fsync, out.fileno())
+        finally:
+            await run_in_threadpool(out.close)
+
+        if validate is not None and not await run_in_threadpool(validate, tmp_path):
+            raise UploadError("The uploaded file is not a valid workbook")
+        await run_in_threadpool(os.replace, tmp_path, path)
+        return size
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,52 @@
+"""
+Shared async OpenAI client for the vector store modules.
+
+One AsyncOpenAI client, and with it one pooled HTTP connection pool, is used by
+every vector store call, so concurrent requests reuse keep-alive connections and
+calls awaited together (e.g. with asyncio.gather) really run concurrently
+instead of blocking the event loop one after another.
+"""
+
+import os
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Connection pool limits
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 50))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 30))
+# Seconds; uploads and polling can take a while, connecting should not
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 120))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", 10))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_client() -> AsyncOpenAI:
+    """Get the shared async OpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+        )
+        _client = AsyncOpenAI(http_client=http_client, max_retries=OPENAI_MAX_RETRIES)
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client and its connections (on application shutdown)"""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.close()
@@ -1,24 +1,33 @@
 import asyncio
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-
-client = OpenAI()
+import os
+from typing import BinaryIO
+from vector_stores.client import get_client
+from vector_stores.search import invalidate_search_cache
 
 # create vector store
 async def create_vector_store(name):
-    vector_store = client.vector_stores.create(        # Create vector store
+    vector_store = await get_client().vector_stores.create(        # Create vector store
         name=name,
     )
     return vector_store
 
+# upload an open binary stream to vector store
+async def upload_file_stream(vector_store_id, filename: str, stream: BinaryIO):
+    # Passed as (name, file object), the content is streamed from the handle in
+    # small chunks rather than read into memory; the caller owns the handle
+    try:
+        return await get_client().vector_stores.files.upload_and_poll(
+            vector_store_id=vector_store_id,
+            file=(filename, stream)
+        )
+    finally:
+        # Even a failed upload may have been attached; drop the store's cached searches
+        invalidate_search_cache(vector_store_id)
+
 # upload file to vector store
 async def upload_file(vector_store_id, file_path):
-    client.vector_stores.files.upload_and_poll(       
-        vector_store_id=vector_store_id,
-        file=open(file_path, "rb")
-    )
+    with open(file_path, "rb") as stream:
+        return await upload_file_stream(vector_store_id, os.path.basename(file_path), stream)
 
 # create all vector stores
 async def create_all_vector_stores():
@@ -1,18 +1,14 @@
-from dotenv import load_dotenv
-from openai import OpenAI
 import asyncio
-
-load_dotenv()
-
-
-client = OpenAI()
+from vector_stores.client import get_client
+from vector_stores.search import invalidate_search_cache
 
 
 # delete vector store by id
 async def delete_vector_store(vector_store_id):
-    deleted_vector_store = client.vector_stores.delete(
+    deleted_vector_store = await get_client().vector_stores.delete(
         vector_store_id=vector_store_id
     )
+    invalidate_search_cache(vector_store_id)
     return deleted_vector_store
 
 
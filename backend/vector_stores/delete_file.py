@@ -1,13 +1,11 @@
 import asyncio
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-
-client = OpenAI()
+from vector_stores.client import get_client
+from vector_stores.search import invalidate_search_cache
 
 # delete file by id
 async def delete_file(file_id):
-    deleted_file = client.files.delete(file_id)
+    deleted_file = await get_client().files.delete(file_id)
+    # The file may belong to any store
+    invalidate_search_cache()
     return deleted_file
 
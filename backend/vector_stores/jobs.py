@@ -0,0 +1,345 @@
+"""
+Background ingestion jobs for vector-store uploads.
+
+An upload request only stages its files on local disk, records a job and returns
+the job id. Uploading to OpenAI, attaching the files to the vector store and
+waiting for embedding run in an asyncio task of the same process, so no HTTP
+request is held open for the duration. Job state is kept in SQLite, which lets
+any worker process answer status queries for any job.
+
+The process running a job holds a lease on it, renewed while the job is
+unfinished. A job whose lease has run out belongs to a process that died and is
+marked as failed the next time it is read. Owners are identified by an id
+generated per process, since a restarted server often gets its old PID back.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import sqlite3
+from contextlib import ExitStack, contextmanager
+from typing import Any, BinaryIO, Dict, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from vector_stores.upload_batch import upload_files_batch
+
+# SQLite database holding job state
+JOBS_DB_PATH = os.path.join(os.getcwd(), "uploads", "ingest_jobs.db")
+# Uploaded files wait here, one directory per job, until the job has run
+JOBS_STAGING_DIR = os.path.join(os.getcwd(), "uploads", "ingest_staging")
+# Jobs processed at the same time by this process
+JOB_CONCURRENCY = int(os.getenv("INGEST_JOB_CONCURRENCY", 2))
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION_SECONDS = float(os.getenv("INGEST_JOB_RETENTION_HOURS", 168)) * 3600
+# Bytes copied at a time when staging an upload
+STAGING_CHUNK_SIZE = 1024 * 1024
+# Seconds a job stays owned by its process without the lease being renewed
+JOB_LEASE_SECONDS = float(os.getenv("INGEST_JOB_LEASE_SECONDS", 60))
+# Leases are renewed several times per lease period
+LEASE_RENEW_INTERVAL = JOB_LEASE_SECONDS / 4
+
+# Identifies this process as the owner of the jobs it runs
+INSTANCE_ID = uuid.uuid4().hex
+
+FINISHED_STATUSES = ("completed", "partial", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    vector_store_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner_pid INTEGER NOT NULL,
+    owner_id TEXT,
+    lease_expires_at REAL,
+    files TEXT NOT NULL,
+    batch_ids TEXT NOT NULL DEFAULT '[]',
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_store ON jobs (vector_store_id, created_at);
+"""
+
+# Columns added to existing job databases after their creation
+JOB_COLUMN_MIGRATIONS = {
+    "owner_id": "ALTER TABLE jobs ADD COLUMN owner_id TEXT",
+    "lease_expires_at": "ALTER TABLE jobs ADD COLUMN lease_expires_at REAL",
+}
+
+_JSON_FIELDS = ("files", "batch_ids")
+_INTERNAL_FIELDS = ("owner_pid", "owner_id", "lease_expires_at")
+_UNFINISHED = "status IN ('queued', 'running')"
+# Unfinished jobs of other processes whose lease has run out; jobs recorded
+# before leases existed have none
+_ORPHANED = f"{_UNFINISHED} AND owner_id IS NOT ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)"
+_ORPHANED_ERROR = "Interrupted: the server running it stopped; upload the files again"
+
+
+def _is_orphaned(row: sqlite3.Row) -> bool:
+    return (row["status"] in ("queued", "running") and row["owner_id"] != INSTANCE_ID
+            and (row["lease_expires_at"] is None or row["lease_expires_at"] < time.time()))
+
+
+class IngestJobStore:
+    """Job records in SQLite, shared by all worker processes"""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, creating the schema on first use"""
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+                for column, statement in JOB_COLUMN_MIGRATIONS.items():
+                    if column not in existing:
+                        conn.execute(statement)
+                self._initialized = True
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for field in _JSON_FIELDS:
+            job[field] = json.loads(job[field])
+        counts: Dict[str, int] = {}
+        for file in job["files"]:
+            counts[file["status"]] = counts.get(file["status"], 0) + 1
+        job["file_counts"] = counts
+        for field in _INTERNAL_FIELDS:
+            del job[field]
+        return job
+
+    @staticmethod
+    def _fail_orphaned(conn: sqlite3.Connection, job_ids: Optional[List[str]] = None) -> List[str]:
+        """Mark orphaned jobs (all of them, or those among job_ids) as failed, returning their IDs"""
+        now = time.time()
+        if job_ids is None:
+            rows = conn.execute(f"SELECT id FROM jobs WHERE {_ORPHANED}", (INSTANCE_ID, now)).fetchall()
+            job_ids = [row["id"] for row in rows]
+        failed = []
+        for job_id in job_ids:
+            # Conditional, so a lease renewed in the meantime wins
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ? AND {_ORPHANED}",
+                (now, _ORPHANED_ERROR, job_id, INSTANCE_ID, now)
+            )
+            if cursor.rowcount:
+                failed.append(job_id)
+        return failed
+
+    def create(self, job_id: str, vector_store_id: str, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Record a new queued job"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, vector_store_id, status, created_at, owner_pid, owner_id, lease_expires_at, files) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, vector_store_id, time.time(), os.getpid(), INSTANCE_ID,
+                 time.time() + JOB_LEASE_SECONDS, json.dumps(files))
+            )
+        return self.get(job_id)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Set fields of a job"""
+        if not fields:
+            return
+        values = [json.dumps(value) if key in _JSON_FIELDS else value for key, value in fields.items()]
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*values, job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job, or None if it does not exist; an orphaned job is failed first"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and _is_orphaned(row) and self._fail_orphaned(conn, [job_id]):
+                row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_jobs(self, vector_store_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the most recent jobs, optionally only those of one vector store; orphaned jobs are failed first"""
+        with self._connect() as conn:
+            if vector_store_id:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE vector_store_id = ? ORDER BY created_at DESC LIMIT ?",
+                    (vector_store_id, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+            failed = set(self._fail_orphaned(conn, [row["id"] for row in rows if _is_orphaned(row)]))
+            if failed:
+                rows = [
+                    conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone() if row["id"] in failed else row
+                    for row in rows
+                ]
+        return [self._to_dict(row) for row in rows]
+
+    def renew_leases(self, owner_id: str = INSTANCE_ID) -> None:
+        """Extend the lease on every unfinished job of a process"""
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET lease_expires_at = ? WHERE owner_id = ? AND {_UNFINISHED}",
+                (time.time() + JOB_LEASE_SECONDS, owner_id)
+            )
+
+    def fail_interrupted(self) -> List[str]:
+        """
+        Mark unfinished jobs of other processes whose lease has run out as failed
+
+        Returns:
+            IDs of the jobs marked as failed
+        """
+        with self._connect() as conn:
+            return self._fail_orphaned(conn)
+
+    def delete_finished_before(self, cutoff: float) -> List[str]:
+        """Forget finished jobs older than cutoff, returning their IDs"""
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({placeholders}) AND finished_at < ?",
+                (*FINISHED_STATUSES, cutoff)
+            ).fetchall()
+            job_ids = [row["id"] for row in rows]
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+        return job_ids
+
+
+job_store = IngestJobStore()
+_job_semaphore: Optional[asyncio.Semaphore] = None
+# Running tasks are referenced here so they are not garbage collected
+_tasks: Set[asyncio.Task] = set()
+_lease_task: Optional[asyncio.Task] = None
+
+
+def _copy_to_file(stream: BinaryIO, path: str) -> None:
+    stream.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(stream, out, STAGING_CHUNK_SIZE)
+
+
+async def submit_upload_job(vector_store_id: str, uploads: List[Tuple[str, BinaryIO]],
+                            file_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Stage uploaded files on disk and start uploading them to a vector store in the background
+
+    Args:
+        vector_store_id: ID of the vector store
+        uploads: (filename, binary stream) pairs; the streams are copied before returning
+        file_ids: Already uploaded file IDs to attach as well
+
+    Returns:
+        The queued job
+    """
+    job_id = uuid.uuid4().hex
+    staging_dir = os.path.join(JOBS_STAGING_DIR, job_id)
+    os.makedirs(staging_dir, exist_ok=True)
+    staged = []
+    try:
+        for position, (filename, stream) in enumerate(uploads):
+            # Prefixed with the position so files with the same name do not collide
+            path = os.path.join(staging_dir, f"{position}-{filename}")
+            await run_in_threadpool(_copy_to_file, stream, path)
+            staged.append((filename, path))
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    files = [{"filename": filename, "file_id": None, "status": "queued", "error": None} for filename, _ in staged]
+    files.extend({"filename": None, "file_id": file_id, "status": "queued", "error": None} for file_id in file_ids or [])
+    job = await run_in_threadpool(job_store.create, job_id, vector_store_id, files)
+
+    global _lease_task
+    task = asyncio.create_task(_run_upload_job(job_id, vector_store_id, staged, file_ids or []))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    if _lease_task is None or _lease_task.done():
+        _lease_task = asyncio.create_task(_renew_leases())
+    return job
+
+
+async def _renew_leases() -> None:
+    """Renew the leases on this process's jobs for as long as it has any"""
+    while _tasks:
+        await asyncio.sleep(LEASE_RENEW_INTERVAL)
+        try:
+            await run_in_threadpool(job_store.renew_leases)
+        except Exception as e:
+            print(f"Error renewing ingestion job leases: {str(e)}")
+
+
+async def _run_upload_job(job_id: str, vector_store_id: str, staged: List[Tuple[str, str]],
+                          file_ids: List[str]) -> None:
+    global _job_semaphore
+    if _job_semaphore is None:
+        _job_semaphore = asyncio.Semaphore(JOB_CONCURRENCY)
+
+    try:
+        async with _job_semaphore:
+            await run_in_threadpool(job_store.update, job_id, status="running", started_at=time.time())
+
+            progress_lock = asyncio.Lock()
+
+            async def save_progress(results: List[Dict[str, Any]]) -> None:
+                # Snapshot and write in order, so an older state never overwrites a newer one
+                async with progress_lock:
+                    snapshot = [dict(result) for result in results]
+                    try:
+                        await run_in_threadpool(job_store.update, job_id, files=snapshot)
+                    except Exception as e:
+                        print(f"Error saving progress of job {job_id}: {str(e)}")
+
+            with ExitStack() as stack:
+                files = [(filename, stack.enter_context(open(path, "rb"))) for filename, path in staged]
+                result = await upload_files_batch(vector_store_id, files, file_ids=file_ids,
+                                                  on_progress=save_progress)
+            await run_in_threadpool(
+                job_store.update, job_id,
+                status=result["status"], files=result["files"], batch_ids=result["batch_ids"],
+                finished_at=time.time()
+            )
+    except Exception as e:
+        print(f"Error running ingestion job {job_id}: {str(e)}")
+        try:
+            await run_in_threadpool(job_store.update, job_id, status="failed", error=str(e), finished_at=time.time())
+        except Exception as update_error:
+            print(f"Error recording failure of job {job_id}: {str(update_error)}")
+    finally:
+        shutil.rmtree(os.path.join(JOBS_STAGING_DIR, job_id), ignore_errors=True)
+
+
+def recover_jobs() -> None:
+    """
+    On startup: fail jobs orphaned by a previous process, drop staged files no
+    unfinished job needs and forget old finished jobs. Jobs whose lease has not
+    run out yet are failed once it has, when they are next read
+    """
+    try:
+        job_store.fail_interrupted()
+        if os.path.isdir(JOBS_STAGING_DIR):
+            for job_id in os.listdir(JOBS_STAGING_DIR):
+                job = job_store.get(job_id)
+                if job is None or job["status"] in FINISHED_STATUSES:
+                    shutil.rmtree(os.path.join(JOBS_STAGING_DIR, job_id), ignore_errors=True)
+        job_store.delete_finished_before(time.time() - JOB_RETENTION_SECONDS)
+    except Exception as e:
+        print(f"Error recovering ingestion jobs: {str(e)}")
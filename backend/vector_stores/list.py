@@ -1,11 +1,6 @@
 import asyncio
 from typing import List, Dict, Optional
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-
-client = OpenAI()
+from vector_stores.client import get_client
 
 async def list_vector_stores() -> List[Dict[str, str]]:
     """
@@ -15,7 +10,7 @@ async def list_vector_stores() -> List[Dict[str, str]]:
         List of dictionaries containing vector store information with 'id' and 'name' keys
     """
     try:
-        vector_stores = client.vector_stores.list()
+        vector_stores = await get_client().vector_stores.list()
         stores = [{"id": store.id, "name": store.name} for store in vector_stores.data]
         return stores
     except Exception as e:
@@ -1,14 +1,9 @@
-from openai import OpenAI
-from dotenv import load_dotenv
 import asyncio
-
-load_dotenv()
-
-client = OpenAI()
+from vector_stores.client import get_client
 
 # list all files in the vector store
 async def list_all_files():
-    files = client.files.list()
+    files = await get_client().files.list()
     # Return the files object instead of just printing it
     return files
 
@@ -1,11 +1,14 @@
-from dotenv import load_dotenv
-from openai import OpenAI
 import asyncio
+import os
+import re
+import time
 from typing import List, Dict, Any, Optional
+from vector_stores.client import get_client
+from tools.result_cache import ResultCache
 
-load_dotenv()
-
-client = OpenAI()
+# Seconds a cached search result is served before the store is asked again
+SEARCH_CACHE_TTL = float(os.getenv("VECTOR_SEARCH_CACHE_TTL", 300))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("VECTOR_SEARCH_CACHE_MAX_ENTRIES", 1024))
 
 class SearchResult:
     def __init__(self, text: str, metadata: Dict[str, Any], score: float):
@@ -13,10 +16,36 @@ class SearchResult:
         self.metadata = metadata
         self.score = score
 
+# Search results keyed by (vector_store_id, normalised query, max_results)
+search_cache = ResultCache(
+    "vector_search",
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+    ttl=SEARCH_CACHE_TTL,
+    size_of=lambda results: sum(len(result.text) + 200 for result in results)
+)
+
+def normalize_query(query: str) -> str:
+    """Fold case, punctuation and spacing so trivially different queries share a cache entry"""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.casefold()).split())
+
+def invalidate_search_cache(vector_store_id: Optional[str] = None) -> int:
+    """
+    Drop cached search results of one vector store, or of all stores if no ID is given,
+    e.g. after files were added to or removed from it.
+    
+    Returns:
+        Number of cached results dropped
+    """
+    if vector_store_id is None:
+        return search_cache.invalidate(lambda key: True)
+    return search_cache.invalidate(lambda key: key[0] == vector_store_id)
+
 async def search_vector_store(vector_store_id: str, query: str, max_results: int = 5) -> List[SearchResult]:
     """
     Search a vector store and return structured results.
     
+    Results are cached per store and normalised query for SEARCH_CACHE_TTL seconds.
+    
     Args:
         vector_store_id: ID of the vector store to search
         query: Search query
@@ -25,21 +54,31 @@ async def search_vector_store(vector_store_id: str, query: str, max_results: int
     Returns:
         List of SearchResult objects containing text, metadata, and relevance scores
     """
+    cache_key = (vector_store_id, normalize_query(query), max_results)
+    hit, cached = search_cache.get(cache_key)
+    if hit:
+        return list(cached)
+    
     try:
-        results = client.vector_stores.search(
+        start = time.perf_counter()
+        results = await get_client().vector_stores.search(
             vector_store_id=vector_store_id,
             query=query,
-            max_results=max_results
+            max_num_results=max_results
         )
         
         structured_results = []
-        for result in results:
+        for result in results.data:
+            metadata = dict(result.attributes or {})
+            metadata.setdefault("source", result.filename)
+            metadata["file_id"] = result.file_id
             structured_results.append(SearchResult(
-                text=result.text,
-                metadata=result.metadata,
+                text="\n".join(part.text for part in result.content),
+                metadata=metadata,
                 score=result.score
             ))
-            
+        
+        search_cache.put(cache_key, tuple(structured_results), cost=time.perf_counter() - start)
         return structured_results
     except Exception as e:
         print(f"Error searching vector store {vector_store_id}: {str(e)}")
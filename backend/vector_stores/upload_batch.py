@@ -0,0 +1,121 @@
+import asyncio
+import os
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+from vector_stores.client import get_client
+from vector_stores.search import invalidate_search_cache
+
+# Files uploaded to OpenAI at the same time
+UPLOAD_CONCURRENCY = int(os.getenv("VECTOR_STORE_UPLOAD_CONCURRENCY", 8))
+# Most file ids the file-batch API accepts in one batch
+MAX_BATCH_FILES = 500
+
+
+async def upload_files_batch(vector_store_id: str, files: List[Tuple[str, BinaryIO]],
+                             file_ids: Optional[List[str]] = None,
+                             max_concurrency: int = UPLOAD_CONCURRENCY,
+                             on_progress: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None) -> Dict[str, Any]:
+    """
+    Upload many files and attach them to a vector store as one file batch.
+
+    Files are uploaded with at most max_concurrency in flight, then attached
+    through the file-batch API, which is polled once for the whole batch
+    instead of once per file.
+
+    Args:
+        vector_store_id: ID of the vector store
+        files: (filename, binary stream) pairs; the caller owns the streams
+        file_ids: Already uploaded file IDs to attach as well, e.g. to retry
+            files whose processing failed in an earlier batch
+        max_concurrency: Maximum number of simultaneous uploads
+        on_progress: Awaited with the per-file results whenever a file has been
+            uploaded, when processing starts and once the batch has been processed
+
+    Returns:
+        Dictionary with the batch IDs, overall status and file counts, and per
+        file its filename, file_id, status ("completed", "failed", "cancelled",
+        "in_progress", "upload_failed" or "attach_failed") and error
+    """
+    client = get_client()
+    semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+    results: List[Dict[str, Any]] = [
+        {"filename": filename, "file_id": None, "status": "pending", "error": None}
+        for filename, _ in files
+    ]
+    results.extend(
+        {"filename": None, "file_id": file_id, "status": "pending", "error": None}
+        for file_id in file_ids or []
+    )
+
+    async def upload(result: Dict[str, Any], filename: str, stream: BinaryIO) -> None:
+        async with semaphore:
+            try:
+                uploaded = await client.files.create(file=(filename, stream), purpose="assistants")
+                result.update(file_id=uploaded.id, status="uploaded")
+            except Exception as e:
+                print(f"Error uploading {filename}: {str(e)}")
+                result.update(status="upload_failed", error=str(e))
+        if on_progress is not None:
+            await on_progress(results)
+
+    await asyncio.gather(*(
+        upload(result, filename, stream)
+        for result, (filename, stream) in zip(results, files)
+    ))
+
+    pending = [result for result in results if result["file_id"] and result["status"] in ("pending", "uploaded")]
+    for result in pending:
+        result["status"] = "processing"
+    if pending and on_progress is not None:
+        await on_progress(results)
+    groups = [pending[i:i + MAX_BATCH_FILES] for i in range(0, len(pending), MAX_BATCH_FILES)]
+
+    async def attach(group: List[Dict[str, Any]]) -> Optional[Any]:
+        try:
+            batch = await client.vector_stores.file_batches.create_and_poll(
+                vector_store_id=vector_store_id,
+                file_ids=[result["file_id"] for result in group]
+            )
+            statuses = {}
+            async for vector_store_file in client.vector_stores.file_batches.list_files(
+                batch.id, vector_store_id=vector_store_id, limit=100
+            ):
+                statuses[vector_store_file.id] = vector_store_file
+            for result in group:
+                vector_store_file = statuses.get(result["file_id"])
+                if vector_store_file is None:
+                    result["status"] = "unknown"
+                    continue
+                result["status"] = vector_store_file.status
+                if vector_store_file.last_error is not None:
+                    result["error"] = vector_store_file.last_error.message
+            return batch
+        except Exception as e:
+            print(f"Error attaching files to vector store {vector_store_id}: {str(e)}")
+            for result in group:
+                result.update(status="attach_failed", error=str(e))
+            return None
+
+    batches = [batch for batch in await asyncio.gather(*(attach(group) for group in groups)) if batch]
+    if groups:
+        invalidate_search_cache(vector_store_id)
+    if on_progress is not None:
+        await on_progress(results)
+
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    succeeded = counts.get("completed", 0)
+    if succeeded == len(results):
+        status = "completed"
+    elif succeeded:
+        status = "partial"
+    else:
+        status = "failed"
+
+    return {
+        "vector_store_id": vector_store_id,
+        "batch_ids": [batch.id for batch in batches],
+        "status": status,
+        "file_counts": counts,
+        "files": results
+    }